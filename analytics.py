@@ -0,0 +1,301 @@
+"""
+User interaction analytics for Champion Cleaners Assistant
+
+Events are appended to an in-memory ring buffer and written off the request
+path by a background thread, in batches, to append-only JSONL files under
+ANALYTICS_DIR. Each process writes its own files, so concurrent server
+processes never interleave lines. A file is closed and a new one started when
+it passes ANALYTICS_MAX_FILE_BYTES, is older than ANALYTICS_ROTATE_SECONDS, or
+the day changes; when the day changes the previous day is rolled up into a
+compact columnar summary (see build_daily_rollup).
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    ANALYTICS_ENABLED, ANALYTICS_DIR, ANALYTICS_BUFFER_SIZE, ANALYTICS_BATCH_SIZE,
+    ANALYTICS_FLUSH_INTERVAL_SECONDS, ANALYTICS_MAX_FILE_BYTES, ANALYTICS_ROTATE_SECONDS
+)
+from metrics import log_error, timed
+
+
+def _event_files(directory: str, day: date) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, f"events-{day:%Y%m%d}-*.jsonl")))
+
+
+def _rollup_path(directory: str, day: date) -> str:
+    return os.path.join(directory, f"rollup-{day:%Y%m%d}.json")
+
+
+class EventLogger:
+    """
+    Buffers interaction events and writes them to rotating JSONL files.
+
+    record() only appends to a bounded deque, so a click never waits on disk
+    I/O. The writer thread drains the buffer every flush_interval seconds, or
+    sooner once batch_size events are waiting. When the buffer is full the
+    oldest events are dropped (and counted) rather than slowing requests down.
+    """
+
+    def __init__(self, directory: str, buffer_size: int, batch_size: int,
+                 flush_interval: float, max_file_bytes: int, rotate_seconds: float):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.rotate_seconds = rotate_seconds
+        self._buffer: "deque[Tuple[float, str, dict]]" = deque(maxlen=buffer_size)
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Held while draining the buffer into the current file
+        self._file = None
+        self._file_day: Optional[date] = None
+        self._file_opened = 0.0
+        self.dropped = 0
+        self.written = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="analytics-writer", daemon=True
+                )
+                self._thread.start()
+
+    def record(self, event_type: str, data: dict) -> None:
+        """Buffer one event; never blocks on I/O."""
+        self._ensure_started()
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((time.time(), event_type, data))
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.write_pending()
+        self.write_pending()
+
+    def _open(self, day: date, now: float) -> None:
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"events-{day:%Y%m%d}-{datetime.fromtimestamp(now):%H%M%S}-{os.getpid()}.jsonl"
+        self._file = open(os.path.join(self.directory, name), "a", encoding="utf-8")
+        self._file_day = day
+        self._file_opened = now
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _needs_rotation(self, day: date, now: float) -> bool:
+        return (
+            self._file is None
+            or day != self._file_day
+            or now - self._file_opened >= self.rotate_seconds
+            or self._file.tell() >= self.max_file_bytes
+        )
+
+    def write_pending(self) -> int:
+        """
+        Write every buffered event to disk.
+
+        Returns:
+            Number of events written
+        """
+        with self._write_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return 0
+
+            try:
+                with timed("analytics.EventLogger.write_batch"):
+                    finished_days = set()
+                    lines = []
+                    for ts, event_type, data in batch:
+                        moment = datetime.fromtimestamp(ts)
+                        day = moment.date()
+                        if lines and day != self._file_day:
+                            self._file.write("".join(lines))
+                            lines = []
+                        if not lines and self._needs_rotation(day, ts):
+                            if self._file_day is not None and day != self._file_day:
+                                finished_days.add(self._file_day)
+                            self._open(day, ts)
+                        lines.append(json.dumps(
+                            {"ts": moment.isoformat(timespec="milliseconds"), "type": event_type, "data": data},
+                            separators=(",", ":"), default=str
+                        ) + "\n")
+                    self._file.write("".join(lines))
+                    self._file.flush()
+                self.written += len(batch)
+            except Exception as e:
+                log_error(f"Error writing {len(batch)} analytics events", e)
+                return 0
+
+        for day in sorted(finished_days):
+            build_daily_rollup(day, self.directory)
+        return len(batch)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Write out buffered events, stop the writer thread and close the file."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._stopping = True
+            self._wake.set()
+            thread.join(timeout)
+        self.write_pending()
+        with self._write_lock:
+            self._close()
+
+
+_event_logger = EventLogger(
+    ANALYTICS_DIR, ANALYTICS_BUFFER_SIZE, ANALYTICS_BATCH_SIZE,
+    ANALYTICS_FLUSH_INTERVAL_SECONDS, ANALYTICS_MAX_FILE_BYTES, ANALYTICS_ROTATE_SECONDS
+)
+atexit.register(_event_logger.shutdown)
+
+
+def record_event(event_type: str, data: Optional[dict] = None) -> None:
+    """
+    Record a user interaction without waiting for it to be written.
+
+    The event is timestamped now and written by the background thread within
+    ANALYTICS_FLUSH_INTERVAL_SECONDS; call flush_events() to wait for it.
+
+    Args:
+        event_type: Type of interaction (page_view, schedule, track, faq, etc.)
+        data: JSON-serializable event details; keep personal data out of it
+    """
+    if ANALYTICS_ENABLED:
+        _event_logger.record(event_type, dict(data) if data else {})
+
+
+def flush_events() -> int:
+    """
+    Write buffered events to disk now.
+
+    Returns:
+        Number of events written
+    """
+    return _event_logger.write_pending()
+
+
+def get_analytics_stats() -> Dict[str, int]:
+    """
+    Get counters for the event pipeline in this process.
+
+    Returns:
+        Dictionary with buffered, written and dropped event counts
+    """
+    return {
+        "buffered": len(_event_logger._buffer),
+        "written": _event_logger.written,
+        "dropped": _event_logger.dropped,
+    }
+
+
+def build_daily_rollup(day: date, directory: str = ANALYTICS_DIR) -> Optional[Dict]:
+    """
+    Aggregate one day's events into a columnar rollup file.
+
+    Events are counted per (type, hour, outcome), where outcome is the event's
+    "outcome" field, or "" if it has none. The rollup is stored as parallel
+    column lists, sorted by type, hour and outcome, in rollup-YYYYMMDD.json;
+    rebuilding it is safe at any time and picks up late events.
+
+    Args:
+        day: Day to roll up
+        directory: Directory holding the event files
+
+    Returns:
+        The rollup dictionary, or None if the day has no event files
+    """
+    paths = _event_files(directory, day)
+    if not paths:
+        return None
+
+    counts: Counter = Counter()
+    try:
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # Partial last line from an interrupted write
+                    data = event.get("data") or {}
+                    counts[(event["type"], int(event["ts"][11:13]), str(data.get("outcome", "")))] += 1
+
+        keys = sorted(counts)
+        rollup = {
+            "date": day.isoformat(),
+            "events": sum(counts.values()),
+            "columns": {
+                "type": [key[0] for key in keys],
+                "hour": [key[1] for key in keys],
+                "outcome": [key[2] for key in keys],
+                "count": [counts[key] for key in keys],
+            },
+        }
+
+        path = _rollup_path(directory, day)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(rollup, f, separators=(",", ":"))
+        os.replace(temp_path, path)  # Readers never see a half-written rollup
+        return rollup
+    except Exception as e:
+        log_error(f"Error building analytics rollup for {day}", e)
+        return None
+
+
+def load_daily_rollup(day: date, directory: str = ANALYTICS_DIR) -> Optional[Dict]:
+    """
+    Read a day's rollup, building it first if it is missing or out of date.
+
+    The rollup is rebuilt when any of the day's event files changed after it
+    was written, e.g. when another server process flushed late events after
+    the process that crossed midnight rolled the day up.
+
+    Args:
+        day: Day to load
+        directory: Directory holding the event and rollup files
+
+    Returns:
+        Rollup dictionary with "date", "events" and "columns", or None if the
+        day has no events
+    """
+    path = _rollup_path(directory, day)
+    try:
+        built = os.stat(path).st_mtime_ns
+        if any(os.stat(events).st_mtime_ns > built for events in _event_files(directory, day)):
+            return build_daily_rollup(day, directory)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return build_daily_rollup(day, directory)
+    except Exception as e:
+        log_error(f"Error loading analytics rollup for {day}", e)
+        return None
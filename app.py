@@ -8,24 +8,24 @@ from datetime import datetime
 from typing import Optional
 import sys
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', '')
 
 # Import custom modules
-from config import BRAND_COLORS, SERVICES, COVERAGE_AREAS, APP_TITLE, APP_SUBTITLE, WEBSITE, EMAIL, PHONE
+# Modules used by a single page (faq_data) or by the admin panel are imported
+# inside the function that needs them, so a cold start only loads what the
+# first page renders; later reruns find them in sys.modules.
+from config import (
+    BRAND_COLORS, SERVICES, COVERAGE_AREAS, APP_TITLE, APP_SUBTITLE, WEBSITE, EMAIL, PHONE,
+    OFFERS_CACHE_TTL_SECONDS, SLOT_AVAILABILITY_CACHE_TTL_SECONDS, ADMIN_PANEL_ENABLED
+)
 from backend import (
     save_order, get_order, log_notification, 
-    get_active_offers, get_all_orders, get_notifications
+    get_active_offers, get_all_orders, get_notifications,
+    register_write_listener, get_slot_availability
 )
-from faq_data import retrieve_faq_answer, search_faq
 from utils import (
-    validate_phone_number, validate_email, validate_pickup_date,
-    validate_pickup_time, validate_full_name, validate_address,
+    validate_phone_number, validate_email, validate_order_fields,
     format_phone_for_display, get_future_dates, get_time_slots,
-    get_greeting_message, truncate_text
+    get_greeting_message, truncate_text, log_user_interaction
 )
 
 
@@ -222,6 +222,51 @@ if "customer_info" not in st.session_state:
     st.session_state.customer_info = {}
 
 
+# ========================
+# Cached Data Layer
+# ========================
+
+@st.cache_data(ttl=OFFERS_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_active_offers(target_audience: Optional[str] = None) -> list:
+    """Active offers, shared across sessions until the TTL expires or offers change."""
+    return get_active_offers(target_audience)
+
+
+@st.cache_data(ttl=SLOT_AVAILABILITY_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_open_slots(pickup_date: str, emirate: str, interval_minutes: int) -> list:
+    """Time slots on a date that still have capacity in an emirate."""
+    slots = get_time_slots(interval_minutes, pickup_date, emirate)
+    availability = get_slot_availability(pickup_date, emirate, slots)
+    return [slot for slot, remaining in availability.items() if remaining > 0]
+
+
+def invalidate_cached_data(table: str):
+    """Drop cached query results that depend on a table the backend just wrote."""
+    if table == "offers":
+        cached_active_offers.clear()
+    elif table == "orders":
+        cached_open_slots.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def init_backend() -> bool:
+    """
+    Load environment variables and hook cache invalidation once per server process.
+    
+    The databases are not touched here: backend functions create them on
+    first use, so pages that never query them start without any disk I/O.
+    """
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', '')
+    register_write_listener(invalidate_cached_data)
+    return True
+
+
+init_backend()
+
+
 # ========================
 # UI Components
 # ========================
@@ -291,7 +336,7 @@ def page_schedule_pickup():
     st.markdown("---")
     
     # Check for applicable offers
-    applicable_offers = get_active_offers("all")
+    applicable_offers = cached_active_offers("all")
     if applicable_offers:
         st.markdown("### 🎉 Available Offers")
         for offer in applicable_offers[:3]:  # Show top 3 offers
@@ -332,22 +377,32 @@ def page_schedule_pickup():
     
     st.markdown("### Pickup Schedule")
     
+    emirate = st.selectbox(
+        "Emirate *",
+        options=COVERAGE_AREAS,
+        key="pickup_emirate"
+    )
+    
     col1, col2 = st.columns(2)
     
     with col1:
         pickup_date = st.selectbox(
             "Preferred Pickup Date *",
-            options=get_future_dates(30),
+            options=get_future_dates(30, emirate),
             format_func=lambda x: datetime.strptime(x, "%Y-%m-%d").strftime("%A, %d %B %Y"),
             key="pickup_date"
         )
     
+    # Only offer slots that still have room
+    open_slots = cached_open_slots(pickup_date, emirate, 30)
     with col2:
         pickup_time = st.selectbox(
             "Preferred Pickup Time *",
-            options=get_time_slots(30),
+            options=open_slots,
             key="pickup_time"
         )
+    if not open_slots:
+        render_warning_message(f"All pickup slots in {emirate} are fully booked on this date. Please choose another date.")
     
     st.markdown("### Service Selection")
     
@@ -369,50 +424,18 @@ def page_schedule_pickup():
     
     if st.button("📤 Confirm & Schedule Pickup", use_container_width=True):
         # Validate inputs
-        errors = []
-        
-        if not full_name:
-            errors.append("Full name is required")
-        else:
-            valid, msg = validate_full_name(full_name)
-            if not valid:
-                errors.append(msg)
-        
-        if not phone:
-            errors.append("Phone number is required")
-        else:
-            valid, msg = validate_phone_number(phone)
-            if not valid:
-                errors.append(msg)
-        
-        if email:
-            valid, msg = validate_email(email)
-            if not valid:
-                errors.append(msg)
-        
-        if not pickup_address:
-            errors.append("Pickup address is required")
-        else:
-            valid, msg = validate_address(pickup_address)
-            if not valid:
-                errors.append(msg)
-        
-        if not pickup_date:
-            errors.append("Pickup date is required")
-        else:
-            valid, msg = validate_pickup_date(pickup_date)
-            if not valid:
-                errors.append(msg)
-        
-        if not pickup_time:
-            errors.append("Pickup time is required")
-        else:
-            valid, msg = validate_pickup_time(pickup_time)
-            if not valid:
-                errors.append(msg)
+        errors = validate_order_fields({
+            "full_name": full_name,
+            "phone_number": phone,
+            "email": email,
+            "pickup_address": pickup_address,
+            "pickup_date": pickup_date,
+            "pickup_time": pickup_time,
+        })
         
         # Show validation errors
         if errors:
+            log_user_interaction("schedule", {"outcome": "invalid", "errors": len(errors)})
             for error in errors:
                 render_error_message(error)
         else:
@@ -425,9 +448,18 @@ def page_schedule_pickup():
                 pickup_date=pickup_date,
                 pickup_time=pickup_time,
                 service_type=service_type,
-                notes=notes if notes else None
+                notes=notes if notes else None,
+                emirate=emirate
             )
             
+            log_user_interaction("schedule", {
+                "outcome": "scheduled" if success else "failed",
+                "service_type": service_type,
+                "emirate": emirate,
+                "pickup_date": pickup_date,
+                "pickup_time": pickup_time,
+            })
+            
             if success:
                 order_id = result
                 # Log notification for team
@@ -482,7 +514,7 @@ def page_track_order():
     if search_method == "Order ID":
         order_id = st.text_input(
             "Enter your Order ID *",
-            placeholder="e.g., CC20250101ABCD1234",
+            placeholder="e.g., CC202501011R2K9D7F3QXA",
             key="track_order_id"
         )
         
@@ -491,6 +523,7 @@ def page_track_order():
                 render_error_message("Please enter an Order ID")
             else:
                 order = get_order(order_id=order_id)
+                log_user_interaction("track", {"method": "order_id", "outcome": "found" if order else "not_found"})
                 
                 if order:
                     render_success_message("Order Found!")
@@ -535,6 +568,7 @@ def page_track_order():
                     render_error_message(msg)
                 else:
                     order = get_order(phone_number=phone)
+                    log_user_interaction("track", {"method": "phone", "outcome": "found" if order else "not_found"})
                     
                     if order:
                         render_success_message("Order Found!")
@@ -569,6 +603,8 @@ def page_track_order():
 
 def page_faq():
     """FAQ page."""
+    from faq_data import rank_faq, get_faq_by_question
+    
     st.markdown("## ❓ Frequently Asked Questions")
     st.markdown("---")
     
@@ -582,10 +618,17 @@ def page_faq():
     
     if st.button("🔍 Find Answer", use_container_width=True) or user_question:
         if user_question and len(user_question.strip()) >= 3:
-            # Retrieve FAQ answer
-            q, answer, confidence = retrieve_faq_answer(user_question)
+            # Rank FAQs once; the best answer and related questions share this pass
+            ranking = rank_faq(user_question, k=4)
+            q, answer, confidence = ranking.best
+            answered = confidence > 0.15 and bool(answer)
+            log_user_interaction("faq", {
+                "outcome": "answered" if answered else "unanswered",
+                "question": q if answered else None,
+                "confidence": round(confidence, 3),
+            })
             
-            if confidence > 0.15 and answer:
+            if answered:
                 render_success_message("Found a relevant answer!")
                 st.markdown(f"""
                 <div class="card">
@@ -598,9 +641,9 @@ def page_faq():
                 st.markdown("### Related Questions")
                 
                 # Show related FAQs
-                related = search_faq(user_question)
+                related = ranking.related(3)  # Show next 3 most relevant
                 if related:
-                    for i, faq in enumerate(related[1:4], 1):  # Show next 3 most relevant
+                    for i, faq in enumerate(related, 1):
                         with st.expander(f"{i}. {truncate_text(faq['question'], 60)}"):
                             st.write(faq['answer'])
             else:
@@ -629,24 +672,23 @@ def page_faq():
                         "How do I schedule a pickup?"
                     ]
                     for q in faq_list:
-                        answer, _, _ = retrieve_faq_answer(q)
-                        if answer:
+                        faq = get_faq_by_question(q)
+                        if faq:
                             with st.expander(q):
-                                a, _, _ = retrieve_faq_answer(q)
-                                st.write(a)
+                                st.write(faq["answer"])
                 
                 with col2:
                     st.markdown("**Services**")
                     faq_list = [
                         "What is the Bag & Shoe Spa service?",
                         "Do you offer carpet and upholstery cleaning?",
-                        "How do you clean delicate fabrics?"
+                        "How do you clean delicate fabrics and wedding gowns?"
                     ]
                     for q in faq_list:
-                        if retrieve_faq_answer(q)[0]:
+                        faq = get_faq_by_question(q)
+                        if faq:
                             with st.expander(q):
-                                a, _, _ = retrieve_faq_answer(q)
-                                st.write(a)
+                                st.write(faq["answer"])
 
 
 # ========================
@@ -659,7 +701,7 @@ def page_offers():
     st.markdown("---")
     
     # Get active offers
-    all_offers = get_active_offers()
+    all_offers = cached_active_offers()
     
     if all_offers:
         st.markdown(f"### Active Offers ({len(all_offers)})")
@@ -700,6 +742,7 @@ def page_offers():
                 render_error_message(msg)
             else:
                 # In production: subscribe to email list
+                log_user_interaction("offer_subscription", {"outcome": "subscribed"})
                 render_success_message("Thank you! You'll receive notifications about our latest offers.")
                 log_notification(
                     order_id=None,
@@ -841,6 +884,38 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 
+# ========================
+# Admin: Metrics Panel
+# ========================
+
+def render_metrics_panel():
+    """Show backend and FAQ call metrics for this server process."""
+    from db import get_db_stats
+    from metrics import get_metrics, reset_metrics, render_prometheus
+    
+    with st.expander("📊 Metrics"):
+        metrics = get_metrics()
+        if metrics:
+            st.dataframe([{
+                "function": m["name"],
+                "calls": m["calls"],
+                "errors": m["errors"],
+                "rows": m["rows"],
+                "busy retries": m["busy_retries"],
+                "mean ms": round(m["mean_seconds"] * 1000, 2),
+                "p95 ms ≤": round(m["p95_seconds"] * 1000, 2),
+            } for m in metrics], hide_index=True, use_container_width=True)
+        else:
+            st.caption("No calls recorded yet.")
+        
+        st.caption("Database: " + ", ".join(f"{name} {value}" for name, value in get_db_stats().items()))
+        st.download_button("Download Prometheus metrics", render_prometheus(),
+                           file_name="metrics.prom", mime="text/plain", use_container_width=True)
+        if st.button("Reset metrics", use_container_width=True, key="metrics_reset"):
+            reset_metrics()
+            st.rerun()
+
+
 # ========================
 # Main Application Flow
 # ========================
@@ -850,10 +925,16 @@ def main():
     # Apply styling first
     apply_custom_styling()
     
-    # Layout: sidebar + main content
+    # Layout: sidebar (navigation is rendered above) + main content
     with st.sidebar:
         st.markdown(f"<div class='main-header'><h2>🧹 Champion Cleaners</h2><p>Your Trusted Laundry Partner</p></div>", unsafe_allow_html=True)
-        sidebar_navigation()
+        if ADMIN_PANEL_ENABLED:
+            render_metrics_panel()
+    
+    # One page_view per page visited, not per rerun
+    if st.session_state.get("viewed_page") != st.session_state.page:
+        st.session_state.viewed_page = st.session_state.page
+        log_user_interaction("page_view", {"page": st.session_state.page})
     
     # Main content
     if st.session_state.page == "home":
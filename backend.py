@@ -2,20 +2,32 @@
 Backend database operations for Champion Cleaners orders and offers
 """
 
+import atexit
+import csv
+import hashlib
+import queue
+import secrets
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-import os
-from config import DB_PATH, OFFERS_DB_PATH
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, IO, Union, Callable
+from config import (
+    DB_PATH, OFFERS_DB_PATH, OFFERS_SNAPSHOT_MAX_AGE_SECONDS, NOTIFICATIONS_ASYNC,
+    NOTIFICATION_BATCH_SIZE, NOTIFICATION_FLUSH_INTERVAL_MS, NOTIFICATION_QUEUE_MAXSIZE,
+    NOTIFICATION_ENQUEUE_TIMEOUT_SECONDS, NOTIFICATION_DEDUP_WINDOW_SECONDS, ORDER_STATUSES,
+    SLOT_CAPACITY, SLOT_CAPACITY_BY_EMIRATE
+)
+from db import connection, run_transaction, apply_migrations, initialize_once
+from metrics import instrument, log_error, timed
+from utils import format_phone_for_display, validate_order_fields, detect_emirate
 
 
-def init_orders_db():
-    """Initialize orders database with required tables."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Orders table
-    cursor.execute("""
+# Schema migrations: (version, description, statements). Append new versions;
+# never edit one that has shipped.
+ORDERS_MIGRATIONS = [
+    (1, "create orders and notifications tables", [
+        """
         CREATE TABLE IF NOT EXISTS orders (
             order_id TEXT PRIMARY KEY,
             full_name TEXT NOT NULL,
@@ -29,10 +41,9 @@ def init_orders_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             notes TEXT
         )
-    """)
-    
-    # Team notifications table for tracking attempts
-    cursor.execute("""
+        """,
+        # Team notifications table for tracking attempts
+        """
         CREATE TABLE IF NOT EXISTS notifications (
             notification_id INTEGER PRIMARY KEY AUTOINCREMENT,
             order_id TEXT,
@@ -42,18 +53,79 @@ def init_orders_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (order_id) REFERENCES orders (order_id)
         )
-    """)
-    
-    conn.commit()
-    conn.close()
-
+        """,
+    ]),
+    (2, "add order and notification lookup indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_orders_phone_created ON orders (phone_number, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_pickup ON orders (status, pickup_date)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_type_created ON notifications (query_type, created_at)",
+    ]),
+    (3, "index orders by (created_at, order_id) for keyset pagination", [
+        "DROP INDEX IF EXISTS idx_orders_created",
+        "CREATE INDEX IF NOT EXISTS idx_orders_created_id ON orders (created_at, order_id)",
+    ]),
+    (4, "add canonical E.164 phone column for lookups", [
+        "ALTER TABLE orders ADD COLUMN phone_e164 TEXT",
+        # canonical_phone() is utils.format_phone_for_display, registered per connection
+        "UPDATE orders SET phone_e164 = canonical_phone(phone_number)",
+        "DROP INDEX IF EXISTS idx_orders_phone_created",
+        "CREATE INDEX IF NOT EXISTS idx_orders_phone_e164_created ON orders (phone_e164, created_at)",
+    ]),
+    (5, "coalesce repeated notifications", [
+        "ALTER TABLE notifications ADD COLUMN fingerprint TEXT",
+        "ALTER TABLE notifications ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE notifications ADD COLUMN last_seen_at TIMESTAMP",
+        "UPDATE notifications SET last_seen_at = created_at",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_fingerprint ON notifications (fingerprint, created_at)",
+    ]),
+    (6, "add emirate, dispatch index and order status history", [
+        "ALTER TABLE orders ADD COLUMN emirate TEXT",
+        # detect_emirate() is utils.detect_emirate, registered per connection
+        "UPDATE orders SET emirate = detect_emirate(pickup_address)",
+        "DROP INDEX IF EXISTS idx_orders_status_pickup",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_pickup_emirate ON orders (status, pickup_date, emirate)",
+        """
+        CREATE TABLE IF NOT EXISTS order_status_history (
+            history_id INTEGER PRIMARY KEY,
+            order_id TEXT NOT NULL,
+            old_status TEXT,
+            new_status TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (order_id) REFERENCES orders (order_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_status_history_order ON order_status_history (order_id, changed_at)",
+    ]),
+    (7, "add per-slot booking counts", [
+        # Orders without an emirate are counted under ''
+        """
+        CREATE TABLE IF NOT EXISTS slot_bookings (
+            pickup_date TEXT NOT NULL,
+            pickup_time TEXT NOT NULL,
+            emirate TEXT NOT NULL,
+            booked INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (pickup_date, emirate, pickup_time)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO slot_bookings (pickup_date, pickup_time, emirate, booked)
+        SELECT pickup_date, pickup_time, COALESCE(emirate, ''), COUNT(*) FROM orders
+        WHERE status IS NOT 'Cancelled'
+        GROUP BY pickup_date, pickup_time, COALESCE(emirate, '')
+        """,
+    ]),
+    (8, "serve the dispatch list in pickup order from its index", [
+        # A day's orders for one status are few, so emirate is filtered from this range
+        "DROP INDEX IF EXISTS idx_orders_status_pickup_emirate",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_pickup_time ON orders (status, pickup_date, pickup_time, order_id)",
+    ]),
+]
 
-def init_offers_db():
-    """Initialize offers database."""
-    conn = sqlite3.connect(OFFERS_DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
+OFFERS_MIGRATIONS = [
+    (1, "create offers table", [
+        """
         CREATE TABLE IF NOT EXISTS offers (
             offer_id INTEGER PRIMARY KEY AUTOINCREMENT,
             offer_name TEXT NOT NULL,
@@ -66,147 +138,864 @@ def init_offers_db():
             active BOOLEAN DEFAULT 1,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    """)
-    
-    # Seed with sample offers
-    cursor.execute("SELECT COUNT(*) FROM offers")
-    if cursor.fetchone()[0] == 0:
-        sample_offers = [
-            ("New Customer Welcome", "20% off your first order", 20, None, "2025-01-01", "2025-12-31", "new_customers"),
-            ("Winter Special", "Free sanitizing with any order", None, 0, "2025-01-01", "2025-02-28", "all"),
-            ("Loyalty Reward", "15% off for returning customers", 15, None, "2025-01-01", "2025-12-31", "returning"),
-        ]
-        
-        for offer in sample_offers:
-            cursor.execute("""
-                INSERT INTO offers (offer_name, description, discount_percent, discount_amount, 
-                                   valid_from, valid_to, target_audience)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, offer)
+        """,
+    ]),
+    (2, "seed sample offers", [
+        # Only seeds a fresh database; existing offer data is left untouched
+        """
+        INSERT INTO offers (offer_name, description, discount_percent, discount_amount,
+                            valid_from, valid_to, target_audience)
+        SELECT * FROM (VALUES
+            ('New Customer Welcome', '20% off your first order', 20, NULL, '2025-01-01', '2025-12-31', 'new_customers'),
+            ('Winter Special', 'Free sanitizing with any order', NULL, 0, '2025-01-01', '2025-02-28', 'all'),
+            ('Loyalty Reward', '15% off for returning customers', 15, NULL, '2025-01-01', '2025-12-31', 'returning')
+        )
+        WHERE NOT EXISTS (SELECT 1 FROM offers)
+        """,
+    ]),
+]
+
+
+@instrument()
+def init_orders_db():
+    """Initialize orders database with required tables."""
+    run_transaction(DB_PATH, _create_orders_tables)
+
+
+def _create_orders_tables(conn):
+    """Create the orders and notifications tables if they are missing."""
+    conn.create_function("canonical_phone", 1, format_phone_for_display, deterministic=True)
+    conn.create_function("detect_emirate", 1, detect_emirate, deterministic=True)
+    apply_migrations(conn, ORDERS_MIGRATIONS)
+
+
+def ensure_orders_db():
+    """Initialize the orders database once per process."""
+    initialize_once(DB_PATH, _create_orders_tables)
+
+
+@instrument()
+def init_offers_db():
+    """Initialize offers database."""
+    run_transaction(OFFERS_DB_PATH, _create_offers_tables)
+
+
+def _create_offers_tables(conn):
+    """Create and seed the offers table if it is missing."""
+    apply_migrations(conn, OFFERS_MIGRATIONS)
+
+
+def ensure_offers_db():
+    """Initialize the offers database once per process."""
+    initialize_once(OFFERS_DB_PATH, _create_offers_tables)
+
+
+# Callbacks run after a successful write, with the name of the table written
+_write_listeners: List[Callable[[str], None]] = []
+
+
+def register_write_listener(callback: Callable[[str], None]) -> None:
+    """
+    Register a callback to run after backend writes (e.g. to invalidate caches).
     
-    conn.commit()
-    conn.close()
+    Args:
+        callback: Called with the table name ("orders", "offers") after each commit
+    """
+    if callback not in _write_listeners:
+        _write_listeners.append(callback)
+
+
+def _notify_write(table: str) -> None:
+    """Tell write listeners that a table changed."""
+    for callback in list(_write_listeners):
+        try:
+            callback(table)
+        except Exception as e:
+            log_error("Error in write listener", e)
+
+
+# Crockford base32: sorts the same as the numbers it encodes, no I/L/O/U
+_ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_id_lock = threading.Lock()
+_id_day = ("", 0.0, 0.0)    # (YYYYMMDD, local midnight, next midnight) as epoch seconds
+_id_last = (-1, 0)          # (millisecond of day, sequence) of the last ID
+
 
+def _base32(value: int, width: int) -> str:
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(_ID_ALPHABET[digit])
+    return "".join(reversed(chars))
 
+
+@instrument()
 def generate_order_id() -> str:
-    """Generate a unique order ID."""
-    import uuid
-    return f"CC{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
+    """
+    Generate a unique, time-ordered order ID.
+    
+    Format: "CC" + YYYYMMDD + 6 chars of milliseconds since midnight + 6 chars
+    of sequence, e.g. CC202501011R2K9D7F3QXA. The sequence starts at a random
+    value each millisecond and increments within it, so IDs from one process
+    are strictly increasing and IDs from different processes only collide with
+    negligible probability (about 2^-29 per same-millisecond pair). Later IDs
+    sort after earlier ones, keeping primary-key inserts at the end of the index.
+    """
+    global _id_day, _id_last
+    now = time.time()
+    
+    with _id_lock:
+        date, midnight, next_midnight = _id_day
+        if now >= next_midnight:
+            day = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+            date, midnight = day.strftime("%Y%m%d"), day.timestamp()
+            next_midnight = (day + timedelta(days=1)).timestamp()
+            _id_day = (date, midnight, next_midnight)
+            _id_last = (-1, 0)
+        
+        millis = int((now - midnight) * 1000)
+        last_millis, last_seq = _id_last
+        if millis <= last_millis:
+            # Same millisecond (or the clock stepped back): continue the sequence
+            millis, seq = last_millis, last_seq + 1
+            if seq >= 32 ** 6:
+                millis, seq = millis + 1, secrets.randbelow(2 ** 29)
+        else:
+            seq = secrets.randbelow(2 ** 29)
+        _id_last = (millis, seq)
+    
+    return f"CC{date}{_base32(millis, 6)}{_base32(seq, 6)}"
+
 
+# Columns supplied by callers when creating an order
+# email, notes and emirate are optional; emirate defaults to the one named in the address
+ORDER_FIELDS = ("full_name", "phone_number", "email", "pickup_address",
+                "pickup_date", "pickup_time", "service_type", "notes", "emirate")
 
+_INSERT_ORDER_SQL = """
+    INSERT INTO orders 
+    (order_id, full_name, phone_number, phone_e164, email, pickup_address, 
+     pickup_date, pickup_time, service_type, notes, emirate)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _order_row(order_id: str, fields: Dict) -> Tuple:
+    """Build the INSERT parameters for an order from its fields."""
+    return (order_id, fields["full_name"], fields["phone_number"],
+            format_phone_for_display(fields["phone_number"]), fields.get("email") or None,
+            fields["pickup_address"], fields["pickup_date"], fields["pickup_time"],
+            fields["service_type"], fields.get("notes") or None,
+            fields.get("emirate") or detect_emirate(fields["pickup_address"]))
+
+
+def slot_capacity(emirate: Optional[str]) -> int:
+    """Pickups allowed per time slot in an emirate."""
+    return SLOT_CAPACITY_BY_EMIRATE.get(emirate or "", SLOT_CAPACITY)
+
+
+# Takes a slot and its capacity; changes no row when the slot is already full
+_BOOK_SLOT_SQL = """
+    INSERT INTO slot_bookings (pickup_date, pickup_time, emirate, booked)
+    VALUES (?, ?, ?, 1)
+    ON CONFLICT (pickup_date, emirate, pickup_time)
+    DO UPDATE SET booked = booked + 1 WHERE booked < ?
+"""
+
+
+def _insert_order(conn, row: Tuple) -> bool:
+    """
+    Book the order's slot and insert the order in the caller's transaction.
+    
+    Returns:
+        False (and inserts nothing) if the slot is fully booked
+    """
+    pickup_date, pickup_time, emirate = row[6], row[7], row[10] or ""
+    booked = conn.execute(_BOOK_SLOT_SQL, (pickup_date, pickup_time, emirate,
+                                           slot_capacity(emirate))).rowcount
+    if not booked:
+        return False
+    conn.execute(_INSERT_ORDER_SQL, row)
+    return True
+
+
+_COUNT_BOOKINGS_SQL = """
+    INSERT INTO slot_bookings (pickup_date, pickup_time, emirate, booked)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (pickup_date, emirate, pickup_time)
+    DO UPDATE SET booked = booked + excluded.booked
+"""
+
+
+def _insert_orders_counted(conn, rows: List[Tuple]) -> None:
+    """Insert orders and add them to their slots' counts without enforcing capacity."""
+    conn.executemany(_INSERT_ORDER_SQL, rows)
+    counts: Dict[Tuple[str, str, str], int] = {}
+    for row in rows:
+        key = (row[6], row[7], row[10] or "")
+        counts[key] = counts.get(key, 0) + 1
+    conn.executemany(_COUNT_BOOKINGS_SQL, [key + (count,) for key, count in counts.items()])
+
+
+@instrument(rows=len)
+def get_slot_availability(pickup_date: str, emirate: Optional[str],
+                          slots: Iterable[str]) -> Dict[str, int]:
+    """
+    Get the number of open bookings left in each time slot.
+    
+    Reads one primary-key range of slot_bookings for the date and emirate, then
+    looks each slot up in a dictionary.
+    
+    Args:
+        pickup_date: Date in format YYYY-MM-DD
+        emirate: Coverage area (None for orders without one)
+        slots: Time slots to check, in format HH:MM
+        
+    Returns:
+        Dictionary mapping each slot to its remaining capacity, in slot order
+    """
+    capacity = slot_capacity(emirate)
+    try:
+        ensure_orders_db()
+        
+        with connection(DB_PATH) as conn:
+            booked = dict(conn.execute(
+                "SELECT pickup_time, booked FROM slot_bookings WHERE pickup_date = ? AND emirate = ?",
+                (pickup_date, emirate or "")
+            ).fetchall())
+        
+        return {slot: max(capacity - booked.get(slot, 0), 0) for slot in slots}
+    
+    except Exception as e:
+        log_error("Error retrieving slot availability", e)
+        return {slot: capacity for slot in slots}
+
+
+@instrument()
 def save_order(full_name: str, phone_number: str, email: Optional[str],
                pickup_address: str, pickup_date: str, pickup_time: str,
-               service_type: str, notes: Optional[str] = None) -> Tuple[bool, str]:
+               service_type: str, notes: Optional[str] = None,
+               emirate: Optional[str] = None) -> Tuple[bool, str]:
     """
     Save a new order to the database.
     
+    The pickup slot is booked in the same transaction, so concurrent bookings
+    can never exceed the slot's capacity.
+    
     Returns:
         Tuple of (success, order_id or error_message)
     """
     try:
-        init_orders_db()
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        order_id = generate_order_id()
+        ensure_orders_db()
+        fields = {
+            "full_name": full_name, "phone_number": phone_number, "email": email,
+            "pickup_address": pickup_address, "pickup_date": pickup_date,
+            "pickup_time": pickup_time, "service_type": service_type, "notes": notes,
+            "emirate": emirate
+        }
         
-        cursor.execute("""
-            INSERT INTO orders 
-            (order_id, full_name, phone_number, email, pickup_address, 
-             pickup_date, pickup_time, service_type, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (order_id, full_name, phone_number, email, pickup_address,
-              pickup_date, pickup_time, service_type, notes))
-        
-        conn.commit()
-        conn.close()
+        # A cross-process ID clash is vanishingly rare; retry once with a fresh ID
+        for attempt in range(2):
+            order_id = generate_order_id()
+            row = _order_row(order_id, fields)
+            try:
+                if not run_transaction(DB_PATH, _insert_order, row):
+                    return (False, "This pickup slot is fully booked. Please choose another time.")
+                break
+            except sqlite3.IntegrityError:
+                if attempt:
+                    raise
         
+        _notify_write("orders")
         return (True, order_id)
     
     except Exception as e:
+        log_error("Error saving order", e)
         return (False, f"Database error: {str(e)}")
 
 
+@instrument()
+def save_orders_bulk(orders: Iterable[Dict], chunk_size: int = 1000,
+                     validate: bool = True) -> List[Tuple[bool, str]]:
+    """
+    Save many orders, inserting each chunk with one executemany in one transaction.
+    
+    Rows are checked with utils.validate_order_fields() first; invalid rows are
+    reported and skipped. If a chunk fails as a whole, its rows are retried one
+    by one so each gets its own result. Imported orders count towards their
+    slots' bookings but are not refused when a slot is full.
+    
+    Args:
+        orders: Iterable of dictionaries with the ORDER_FIELDS keys
+        chunk_size: Orders per transaction
+        validate: Run the form validators on each row
+        
+    Returns:
+        One (success, order_id or error_message) tuple per input row, in order
+    """
+    ensure_orders_db()
+    results: List[Tuple[bool, str]] = []
+    chunk: List[Tuple[int, Tuple]] = []
+    
+    def write_chunk():
+        try:
+            run_transaction(DB_PATH, _insert_orders_counted, [row for _, row in chunk])
+        except Exception:
+            for index, row in chunk:
+                try:
+                    run_transaction(DB_PATH, _insert_orders_counted, [row])
+                except Exception as e:
+                    results[index] = (False, f"Database error: {str(e)}")
+        chunk.clear()
+    
+    for fields in orders:
+        if not isinstance(fields, dict):
+            results.append((False, "Invalid order data: expected a mapping of order fields"))
+            continue
+        
+        errors = []
+        if validate:
+            try:
+                errors = validate_order_fields(fields)
+            except (AttributeError, TypeError) as e:
+                # e.g. a number where the validators expect text
+                results.append((False, f"Invalid order data: {str(e)}"))
+                continue
+            if not fields.get("service_type"):
+                errors.append("Service type is required")
+        if errors:
+            results.append((False, "; ".join(errors)))
+            continue
+        
+        try:
+            order_id = generate_order_id()
+            chunk.append((len(results), _order_row(order_id, fields)))
+            results.append((True, order_id))
+        except (AttributeError, KeyError, TypeError) as e:
+            results.append((False, f"Invalid order data: {str(e)}"))
+            continue
+        
+        if len(chunk) >= chunk_size:
+            write_chunk()
+    
+    if chunk:
+        write_chunk()
+    if any(success for success, _ in results):
+        _notify_write("orders")
+    return results
+
+
+@instrument()
 def get_order(order_id: Optional[str] = None, phone_number: Optional[str] = None) -> Optional[Dict]:
     """
     Retrieve an order by order_id or phone_number.
     
+    Phone lookups match on the canonical E.164 number, so any accepted format
+    ("+971 50 123 4567", "0501234567", "971501234567") finds the same orders.
+    
     Returns:
         Order dictionary or None if not found
     """
     try:
-        if not os.path.exists(DB_PATH):
-            return None
-        
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        ensure_orders_db()
         
         if order_id:
-            cursor.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,))
+            query, params = "SELECT * FROM orders WHERE order_id = ?", (order_id,)
         elif phone_number:
-            cursor.execute("SELECT * FROM orders WHERE phone_number = ? ORDER BY created_at DESC LIMIT 1", 
-                          (phone_number,))
+            query = "SELECT * FROM orders WHERE phone_e164 = ? ORDER BY created_at DESC LIMIT 1"
+            params = (format_phone_for_display(phone_number),)
         else:
-            conn.close()
             return None
         
-        row = cursor.fetchone()
-        conn.close()
+        with connection(DB_PATH) as conn:
+            row = conn.execute(query, params).fetchone()
         
         if row:
             return dict(row)
         return None
     
     except Exception as e:
-        print(f"Error retrieving order: {str(e)}")
+        log_error("Error retrieving order", e)
         return None
 
 
+@instrument()
 def get_all_orders() -> List[Dict]:
-    """Get all orders from database."""
+    """
+    Get all orders from database.
+    
+    Loads the whole table into memory; use iter_orders() or get_orders_page()
+    for large tables.
+    """
     try:
-        if not os.path.exists(DB_PATH):
-            return []
-        
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        ensure_orders_db()
         
-        cursor.execute("SELECT * FROM orders ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-        conn.close()
+        with connection(DB_PATH) as conn:
+            rows = conn.execute("SELECT * FROM orders ORDER BY created_at DESC").fetchall()
         
         return [dict(row) for row in rows]
     
     except Exception as e:
-        print(f"Error retrieving orders: {str(e)}")
+        log_error("Error retrieving orders", e)
         return []
 
 
-def update_order_status(order_id: str, status: str) -> bool:
-    """Update order status."""
+def _fetch_orders_page(limit: int,
+                       after: Optional[Tuple[str, str]]) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+    """Fetch one keyset page of orders; database errors propagate to the caller."""
+    ensure_orders_db()
+    
+    query = "SELECT * FROM orders"
+    params: list = []
+    if after:
+        query += " WHERE (created_at, order_id) < (?, ?)"
+        params.extend(after)
+    query += " ORDER BY created_at DESC, order_id DESC LIMIT ?"
+    params.append(limit)
+    
+    with connection(DB_PATH) as conn:
+        rows = conn.execute(query, params).fetchall()
+    
+    orders = [dict(row) for row in rows]
+    next_cursor = None
+    if len(orders) == limit:
+        next_cursor = (orders[-1]["created_at"], orders[-1]["order_id"])
+    return (orders, next_cursor)
+
+
+@instrument(rows=lambda result: len(result[0]))
+def get_orders_page(limit: int = 100,
+                    after: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+    """
+    Get one page of orders, newest first, using keyset pagination.
+    
+    Args:
+        limit: Maximum number of orders to return
+        after: Cursor returned by the previous page, or None for the first page
+        
+    Returns:
+        Tuple of (orders, cursor for the next page or None when exhausted)
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        return _fetch_orders_page(limit, after)
+    
+    except Exception as e:
+        log_error("Error retrieving orders page", e)
+        return ([], None)
+
+
+@instrument()
+def iter_orders(batch_size: int = 500) -> Iterator[Dict]:
+    """
+    Stream all orders, newest first, holding at most one batch in memory.
+    
+    Unlike get_orders_page(), a database error part-way through is raised
+    rather than ending the stream early as if every order had been read.
+    
+    Args:
+        batch_size: Number of orders fetched per query
         
-        cursor.execute("UPDATE orders SET status = ? WHERE order_id = ?", 
-                      (status, order_id))
+    Yields:
+        Order dictionaries
+    """
+    cursor = None
+    while True:
+        orders, cursor = _fetch_orders_page(batch_size, cursor)
+        yield from orders
+        if cursor is None:
+            return
+
+
+@instrument(rows=lambda written: written)
+def export_orders_csv(destination: Union[str, IO[str]], chunk_size: int = 1000) -> int:
+    """
+    Export all orders to CSV, writing in chunks with bounded memory.
+    
+    Args:
+        destination: File path or an open text file
+        chunk_size: Number of orders fetched and written per batch
+        
+    Returns:
+        Number of orders written (an empty table produces an empty file)
         
-        conn.commit()
-        conn.close()
+    Raises:
+        sqlite3.Error: If reading orders fails, so a partial file is never
+            reported as a complete export
+    """
+    if isinstance(destination, str):
+        with open(destination, "w", newline="", encoding="utf-8") as f:
+            return export_orders_csv(f, chunk_size)
+    
+    writer = None
+    count = 0
+    cursor = None
+    while True:
+        orders, cursor = _fetch_orders_page(chunk_size, cursor)
+        if orders and writer is None:
+            writer = csv.DictWriter(destination, fieldnames=list(orders[0].keys()))
+            writer.writeheader()
+        if orders:
+            writer.writerows(orders)
+            count += len(orders)
+        if cursor is None:
+            return count
+
+
+# Both statements take (new_status, order_id, new_status); orders already in
+# the new status are skipped so they get no history row
+_RECORD_STATUS_CHANGE_SQL = """
+    INSERT INTO order_status_history (order_id, old_status, new_status)
+    SELECT order_id, status, ? FROM orders WHERE order_id = ? AND status IS NOT ?
+"""
+_UPDATE_STATUS_SQL = "UPDATE orders SET status = ? WHERE order_id = ? AND status IS NOT ?"
+
+
+# Cancelling frees the order's slot; reinstating a cancelled order takes it again
+_RELEASE_SLOT_SQL = """
+    UPDATE slot_bookings SET booked = booked - 1
+    WHERE (pickup_date, pickup_time, emirate) = (
+        SELECT pickup_date, pickup_time, COALESCE(emirate, '') FROM orders
+        WHERE order_id = ? AND status IS NOT 'Cancelled'
+    )
+"""
+_CANCELLED_SLOT_SQL = """
+    SELECT pickup_date, pickup_time, COALESCE(emirate, '') FROM orders
+    WHERE order_id = ? AND status = 'Cancelled'
+"""
+
+
+class _SlotFull(Exception):
+    """Rolls back a status change that would reinstate an order into a full slot."""
+    
+    def __init__(self, order_id: str):
+        super().__init__(f"The pickup slot of order {order_id} is fully booked")
+        self.order_id = order_id
+
+
+def _retake_slots(conn, order_ids: List[str]) -> None:
+    """Book the slots of cancelled orders being reinstated, within their capacity."""
+    for order_id in order_ids:
+        slot = conn.execute(_CANCELLED_SLOT_SQL, (order_id,)).fetchone()
+        if slot is None:
+            continue
+        pickup_date, pickup_time, emirate = slot
+        booked = conn.execute(_BOOK_SLOT_SQL, (pickup_date, pickup_time, emirate,
+                                               slot_capacity(emirate))).rowcount
+        if not booked:
+            raise _SlotFull(order_id)
+
+
+def _change_status(conn, order_ids: Iterable[str], status: str) -> int:
+    """
+    Record history and update status for each order; returns the number changed.
+    
+    Raises:
+        _SlotFull: If a cancelled order would be reinstated into a slot that
+            has since been booked to capacity (the caller's transaction rolls back)
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if status == "Cancelled":
+        conn.executemany(_RELEASE_SLOT_SQL, [(order_id,) for order_id in order_ids])
+    else:
+        _retake_slots(conn, order_ids)
+    params = [(status, order_id, status) for order_id in order_ids]
+    conn.executemany(_RECORD_STATUS_CHANGE_SQL, params)
+    return conn.executemany(_UPDATE_STATUS_SQL, params).rowcount
+
+
+@instrument()
+def update_order_status(order_id: str, status: str) -> bool:
+    """Update order status, recording the change in order_status_history."""
+    try:
+        if status not in ORDER_STATUSES:
+            raise ValueError(f"Unknown status '{status}'")
+        ensure_orders_db()
+        run_transaction(DB_PATH, _change_status, [order_id], status)
+        _notify_write("orders")
         return True
     
     except Exception as e:
-        print(f"Error updating order: {str(e)}")
+        log_error("Error updating order", e)
         return False
 
 
+@instrument()
+def bulk_update_status(order_ids: Iterable[str], status: str) -> Tuple[bool, Union[int, str]]:
+    """
+    Move many orders to one status in a single transaction.
+    
+    Either every order is updated or none are. Orders already in the target
+    status are left alone, and unknown order IDs are ignored. Reinstating a
+    cancelled order whose slot has been booked to capacity since fails the
+    whole update.
+    
+    Args:
+        order_ids: Orders to update, e.g. every pickup on a driver's route
+        status: New status (one of ORDER_STATUSES)
+    
+    Returns:
+        Tuple of (success, number of orders changed or error_message)
+    """
+    try:
+        if status not in ORDER_STATUSES:
+            raise ValueError(f"Unknown status '{status}'")
+        ensure_orders_db()
+        # run_transaction() may re-run _change_status on SQLITE_BUSY, so a
+        # one-shot iterator (e.g. a generator) must not be consumed by the first attempt
+        order_ids = list(order_ids)
+        changed = run_transaction(DB_PATH, _change_status, order_ids, status)
+        if changed:
+            _notify_write("orders")
+        return (True, changed)
+    
+    except _SlotFull as e:
+        log_error("Error updating orders", e)
+        return (False, f"{str(e)}; no orders were updated")
+    
+    except Exception as e:
+        log_error("Error updating orders", e)
+        return (False, f"Database error: {str(e)}")
+
+
+@instrument()
+def get_status_history(order_id: str) -> List[Dict]:
+    """Get an order's status changes, oldest first."""
+    try:
+        ensure_orders_db()
+    
+        with connection(DB_PATH) as conn:
+            rows = conn.execute("""
+                SELECT old_status, new_status, changed_at FROM order_status_history
+                WHERE order_id = ? ORDER BY changed_at, history_id
+            """, (order_id,)).fetchall()
+    
+        return [dict(row) for row in rows]
+    
+    except Exception as e:
+        log_error("Error retrieving status history", e)
+        return []
+
+
+@instrument()
+def get_dispatch_orders(pickup_date: str, status: str = "Scheduled",
+                        emirate: Optional[str] = None) -> List[Dict]:
+    """
+    Get the orders in one status for a pickup date.
+    
+    For example, everything still Scheduled for tomorrow in Dubai. Served by
+    the (status, pickup_date, pickup_time, order_id) index, which also
+    returns the rows in pickup order.
+    
+    Args:
+        pickup_date: Date in format YYYY-MM-DD
+        status: Order status to select
+        emirate: Limit to one coverage area (all areas if None)
+    
+    Returns:
+        List of order dictionaries ordered by pickup time
+    """
+    try:
+        ensure_orders_db()
+    
+        query = "SELECT * FROM orders WHERE status = ? AND pickup_date = ?"
+        params: List = [status, pickup_date]
+        if emirate:
+            query += " AND emirate = ?"
+            params.append(emirate)
+        query += " ORDER BY pickup_time, order_id"
+    
+        with connection(DB_PATH) as conn:
+            rows = conn.execute(query, params).fetchall()
+    
+        return [dict(row) for row in rows]
+    
+    except Exception as e:
+        log_error("Error retrieving dispatch orders", e)
+        return []
+
+
+def notification_fingerprint(order_id: Optional[str], phone_number: str, query_type: str, message: str) -> str:
+    """
+    Identify repeats of the same event: order, query type, phone and whitespace/case-folded message.
+    
+    The order ID is part of the key, so notifications about two different
+    orders are never coalesced, even when their messages are identical.
+    """
+    key = "\x1f".join([order_id or "", query_type or "", phone_number or "",
+                        " ".join((message or "").casefold().split())])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _write_notifications(conn, rows: List[Tuple]) -> None:
+    """
+    Store (order_id, phone_number, query_type, message, created_at, fingerprint) rows.
+    
+    Repeats of an event already logged within NOTIFICATION_DEDUP_WINDOW_SECONDS
+    (same fingerprint) bump that row's hit_count and last_seen_at instead of
+    inserting a new row. Repeats inside one batch are merged before touching
+    the database.
+    """
+    groups: Dict[str, List] = {}
+    for row in rows:
+        fingerprint, created_at = row[5], row[4]
+        group = groups.get(fingerprint)
+        if group is None:
+            groups[fingerprint] = [row, 1, created_at]
+        else:
+            group[1] += 1
+            group[2] = max(group[2], created_at)
+    
+    inserts = []
+    for fingerprint, (row, hits, last_seen) in groups.items():
+        if NOTIFICATION_DEDUP_WINDOW_SECONDS > 0:
+            window_start = (datetime.strptime(row[4], "%Y-%m-%d %H:%M:%S")
+                            - timedelta(seconds=NOTIFICATION_DEDUP_WINDOW_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+            updated = conn.execute("""
+                UPDATE notifications
+                SET hit_count = hit_count + ?, last_seen_at = MAX(last_seen_at, ?)
+                WHERE notification_id = (
+                    SELECT notification_id FROM notifications
+                    WHERE fingerprint = ? AND created_at >= ?
+                    ORDER BY created_at DESC LIMIT 1
+                )
+            """, (hits, last_seen, fingerprint, window_start)).rowcount
+            if updated:
+                continue
+        inserts.append(row + (hits, last_seen))
+    
+    if inserts:
+        conn.executemany("""
+            INSERT INTO notifications
+            (order_id, phone_number, query_type, message, created_at, fingerprint, hit_count, last_seen_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, inserts)
+
+
+class NotificationWriter:
+    """
+    Background writer that batches notification inserts off the request path.
+    
+    Rows are queued by log_notification() and written by a worker thread in
+    one transaction per batch (see _write_notifications), flushed every NOTIFICATION_BATCH_SIZE rows or
+    NOTIFICATION_FLUSH_INTERVAL_MS, whichever comes first. If a batch fails,
+    its rows are retried one at a time, so only the failing rows are lost.
+    The queue is bounded: when it stays full, the caller writes its row
+    synchronously, so load slows requests down instead of growing memory or
+    dropping rows.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, db_path: str, batch_size: int, flush_interval_ms: int, max_queued: int):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue(max_queued)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="notification-writer", daemon=True
+                )
+                self._thread.start()
+    
+    def submit(self, row: Tuple) -> None:
+        """Queue a notification row, writing it inline if the queue stays full."""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=NOTIFICATION_ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            run_transaction(self.db_path, _write_notifications, [row])
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch, stop = [], item is self._STOP
+            if not stop:
+                batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+    
+    def _write(self, batch: List[Tuple]) -> None:
+        """Write a batch in one transaction; if that fails, retry its rows one at a time."""
+        try:
+            with timed("backend.NotificationWriter.write_batch"):
+                run_transaction(self.db_path, _write_notifications, batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                log_error("Error writing notification", e)
+                return
+        
+        # One bad row must not take the rest of its batch down with it
+        for row in batch:
+            try:
+                run_transaction(self.db_path, _write_notifications, [row])
+            except Exception as e:
+                log_error(f"Error writing {row[2]} notification", e)
+    
+    def flush(self) -> None:
+        """Block until every queued notification has been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+    
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Write out queued notifications and stop the worker thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+
+
+_notification_writer = NotificationWriter(
+    DB_PATH, NOTIFICATION_BATCH_SIZE, NOTIFICATION_FLUSH_INTERVAL_MS, NOTIFICATION_QUEUE_MAXSIZE
+)
+atexit.register(_notification_writer.shutdown)
+
+
+@instrument()
+def flush_notifications() -> None:
+    """Wait until queued notifications are in the database."""
+    _notification_writer.flush()
+
+
+@instrument()
 def log_notification(order_id: Optional[str], phone_number: str, 
                     query_type: str, message: str) -> bool:
     """
     Log a team notification for manual follow-up.
     
+    Repeats of the same event within NOTIFICATION_DEDUP_WINDOW_SECONDS are
+    coalesced into one row with a hit_count.
+    
+    With NOTIFICATIONS_ASYNC enabled the row is queued for the background
+    writer and this returns immediately; call flush_notifications() to wait
+    for it to be stored.
+    
     Args:
         order_id: Optional order ID
         phone_number: Customer phone number
@@ -217,126 +1006,159 @@ def log_notification(order_id: Optional[str], phone_number: str,
         Success status
     """
     try:
-        init_orders_db()
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        ensure_orders_db()
+        # Same format and clock (UTC) as SQLite's CURRENT_TIMESTAMP
+        created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        row = (order_id, phone_number, query_type, message, created_at,
+               notification_fingerprint(order_id, phone_number, query_type, message))
         
-        cursor.execute("""
-            INSERT INTO notifications (order_id, phone_number, query_type, message)
-            VALUES (?, ?, ?, ?)
-        """, (order_id, phone_number, query_type, message))
-        
-        conn.commit()
-        conn.close()
+        if NOTIFICATIONS_ASYNC:
+            _notification_writer.submit(row)
+        else:
+            run_transaction(DB_PATH, _write_notifications, [row])
         return True
     
     except Exception as e:
-        print(f"Error logging notification: {str(e)}")
+        log_error("Error logging notification", e)
         return False
 
 
+@instrument()
 def get_notifications(limit: int = 50) -> List[Dict]:
     """Get recent notifications for team review."""
     try:
-        if not os.path.exists(DB_PATH):
-            return []
-        
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM notifications 
-            ORDER BY created_at DESC 
-            LIMIT ?
-        """, (limit,))
+        ensure_orders_db()
+        flush_notifications()
         
-        rows = cursor.fetchall()
-        conn.close()
+        with connection(DB_PATH) as conn:
+            rows = conn.execute("""
+                SELECT * FROM notifications 
+                ORDER BY created_at DESC 
+                LIMIT ?
+            """, (limit,)).fetchall()
         
         return [dict(row) for row in rows]
     
     except Exception as e:
-        print(f"Error retrieving notifications: {str(e)}")
+        log_error("Error retrieving notifications", e)
         return []
 
 
 # Offers database functions
 
+# In-memory snapshot of active offers. Offer validity only changes at date
+# boundaries, so the snapshot holds every active offer and recomputes today's
+# list when the date crosses the next valid_from / valid_to boundary.
+_offers_lock = threading.Lock()
+_offers_snapshot: Optional[Dict] = None
+
+
+def _next_offer_boundary(offers: List[Dict], today: str) -> str:
+    """Earliest date after today on which some offer starts or stops being valid."""
+    boundaries = []
+    for offer in offers:
+        if offer["valid_from"] > today:
+            boundaries.append(offer["valid_from"])
+        if offer["valid_to"] >= today:
+            try:
+                day_after = datetime.strptime(offer["valid_to"], "%Y-%m-%d") + timedelta(days=1)
+                boundaries.append(day_after.strftime("%Y-%m-%d"))
+            except ValueError:
+                pass
+    return min(boundaries) if boundaries else "9999-12-31"
+
+
+def _load_offers_snapshot(today: str, loaded: Optional[List[Dict]] = None) -> Dict:
+    """Build the offers snapshot for today, reading offers from the database unless given."""
+    if loaded is None:
+        with connection(OFFERS_DB_PATH) as conn:
+            rows = conn.execute(
+                "SELECT * FROM offers WHERE active = 1 ORDER BY offer_name, offer_id"
+            ).fetchall()
+        loaded = [dict(row) for row in rows]
+    
+    return {
+        "offers": loaded,
+        "loaded_at": time.monotonic(),
+        "today": today,
+        "refresh_on": _next_offer_boundary(loaded, today),
+        "active": [o for o in loaded if o["valid_from"] <= today <= o["valid_to"]],
+        "by_audience": {},
+    }
+
+
+def invalidate_offers_cache() -> None:
+    """Drop the offers snapshot so the next lookup reloads from the database."""
+    global _offers_snapshot
+    with _offers_lock:
+        _offers_snapshot = None
+
+
+@instrument()
 def get_active_offers(target_audience: Optional[str] = None) -> List[Dict]:
     """
     Get active offers, optionally filtered by target audience.
     
+    Served from an in-memory snapshot that is rebuilt when an offer becomes
+    valid or expires, when add_offer() writes, or after
+    OFFERS_SNAPSHOT_MAX_AGE_SECONDS (to pick up writes from other processes).
+    
     Args:
         target_audience: Filter by target audience (new_customers, returning, all, etc.)
         
     Returns:
         List of active offers
     """
+    global _offers_snapshot
     try:
-        init_offers_db()
-        if not os.path.exists(OFFERS_DB_PATH):
-            return []
-        
-        conn = sqlite3.connect(OFFERS_DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         today = datetime.now().strftime("%Y-%m-%d")
         
-        query = """
-            SELECT * FROM offers 
-            WHERE active = 1 
-            AND valid_from <= ? 
-            AND valid_to >= ?
-        """
-        params = [today, today]
-        
-        if target_audience:
-            query += " AND (target_audience = ? OR target_audience = 'all')"
-            params.append(target_audience)
-        
-        query += " ORDER BY offer_name"
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        with _offers_lock:
+            snapshot = _offers_snapshot
+            if snapshot is None or time.monotonic() - snapshot["loaded_at"] > OFFERS_SNAPSHOT_MAX_AGE_SECONDS:
+                ensure_offers_db()
+                snapshot = _offers_snapshot = _load_offers_snapshot(today)
+            elif today >= snapshot["refresh_on"] or today < snapshot["today"]:
+                snapshot = _offers_snapshot = _load_offers_snapshot(today, snapshot["offers"])
+            
+            key = target_audience or None
+            offers = snapshot["by_audience"].get(key)
+            if offers is None:
+                offers = [
+                    o for o in snapshot["active"]
+                    if not key or o["target_audience"] in (key, "all")
+                ]
+                snapshot["by_audience"][key] = offers
         
-        return [dict(row) for row in rows]
+        return [dict(offer) for offer in offers]
     
     except Exception as e:
-        print(f"Error retrieving offers: {str(e)}")
+        log_error("Error retrieving offers", e)
         return []
 
 
+@instrument()
 def add_offer(offer_name: str, description: str, discount_percent: Optional[float],
              discount_amount: Optional[float], valid_from: str, valid_to: str,
              target_audience: str = "all") -> bool:
     """Add a new offer."""
     try:
-        init_offers_db()
-        conn = sqlite3.connect(OFFERS_DB_PATH)
-        cursor = conn.cursor()
+        ensure_offers_db()
         
-        cursor.execute("""
-            INSERT INTO offers 
-            (offer_name, description, discount_percent, discount_amount, 
-             valid_from, valid_to, target_audience)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (offer_name, description, discount_percent, discount_amount,
-              valid_from, valid_to, target_audience))
+        def insert(conn):
+            conn.execute("""
+                INSERT INTO offers 
+                (offer_name, description, discount_percent, discount_amount, 
+                 valid_from, valid_to, target_audience)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (offer_name, description, discount_percent, discount_amount,
+                  valid_from, valid_to, target_audience))
         
-        conn.commit()
-        conn.close()
+        run_transaction(OFFERS_DB_PATH, insert)
+        invalidate_offers_cache()
+        _notify_write("offers")
         return True
     
     except Exception as e:
-        print(f"Error adding offer: {str(e)}")
+        log_error("Error adding offer", e)
         return False
-
-
-# Initialize databases on import
-if not os.path.exists(DB_PATH):
-    init_orders_db()
-if not os.path.exists(OFFERS_DB_PATH):
-    init_offers_db()
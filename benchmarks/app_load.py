@@ -0,0 +1,256 @@
+"""
+Load-test the Streamlit app headlessly with scripted customer sessions
+
+Each simulated customer is a Streamlit AppTest session that runs one flow:
+schedule a pickup, track an order (by ID or phone), ask FAQ questions or
+browse offers. Customers run concurrently as separate processes, all against
+one throwaway SQLite database seeded with orders. AppTest keeps process-global
+runtime state, so each process drives one session at a time.
+
+Reports p50/p95/p99 latency per page (one sample per script run, i.e. per
+customer interaction), database statement and transaction counts, SQLITE_BUSY
+retries/failures and any exceptions raised by the app. Each schedule and
+track flow checks that the page confirmed the booking or found the order, and
+the run checks that every confirmed booking was stored, so a flow that
+silently does nothing fails the run instead of producing plausible numbers.
+
+Usage:
+    python benchmarks/app_load.py [--customers N] [--sessions N] [--seed-orders N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+
+# Relative share of sessions running each flow
+FLOW_WEIGHTS = {"schedule": 3, "track": 3, "faq": 3, "offers": 1}
+
+FAQ_QUESTIONS = [
+    "what are your opening hours",
+    "how much does dry cleaning cost",
+    "do you deliver to sharjah",
+    "can you clean a wedding dress",
+    "how long does laundry take",
+    "do you clean carpets at home",
+]
+
+
+def percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def button(at, label_prefix: str):
+    return next(b for b in at.button if b.label.startswith(label_prefix))
+
+
+def message_boxes(at, kind: str) -> list:
+    """Text of the app's rendered message boxes of one kind (success, warning, error, info)."""
+    return [m.value for m in at.markdown if f'class="{kind}-box"' in m.value]
+
+
+def expect_success(at, what: str) -> None:
+    """Fail the flow unless the page shows a success box, so a no-op flow is never timed as real work."""
+    if not message_boxes(at, "success"):
+        shown = message_boxes(at, "error") + message_boxes(at, "warning")
+        raise AssertionError(f"{what} did not succeed: {'; '.join(shown) or 'no message shown'}")
+
+
+class Session:
+    """One simulated customer; times every script run under the page's name."""
+
+    def __init__(self, page: str, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.page = page
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.at.session_state.page = page
+        self.timings = []
+        self.exceptions = []
+
+    def run(self, action=None):
+        start = time.perf_counter()
+        if action is None:
+            self.at.run()
+        else:
+            action.run()
+        self.timings.append(time.perf_counter() - start)
+        self.exceptions.extend(e.value for e in self.at.exception)
+
+
+def schedule_flow(session: Session, rng: random.Random, phone: str) -> None:
+    at = session.at
+    session.run()
+    at.text_input(key="pickup_name").input("Load Test Customer")
+    at.text_input(key="pickup_phone").input(phone)
+    at.text_area(key="pickup_address").input("Villa 12, Al Barsha")
+    session.run(at.selectbox(key="pickup_emirate").select(rng.choice(at.selectbox(key="pickup_emirate").options)))
+    dates = at.selectbox(key="pickup_date").options
+    session.run(at.selectbox(key="pickup_date").select(rng.choice(dates[1:] or dates)))
+    slots = at.selectbox(key="pickup_time").options
+    if slots:
+        at.selectbox(key="pickup_time").select(rng.choice(slots))
+    session.run(button(at, "📤").click())
+    expect_success(at, "Scheduling a pickup")
+
+
+def track_flow(session: Session, rng: random.Random, order_ids: list, phones: list) -> None:
+    at = session.at
+    session.run()
+    if rng.random() < 0.5:
+        at.text_input(key="track_order_id").input(rng.choice(order_ids))
+    else:
+        session.run(at.radio[0].set_value("Phone Number"))
+        at.text_input(key="track_phone").input(rng.choice(phones))
+    session.run(button(at, "🔍").click())
+    expect_success(at, "Tracking a seeded order")  # Every tracked ID and phone was seeded
+
+
+def faq_flow(session: Session, rng: random.Random) -> None:
+    at = session.at
+    session.run()
+    for question in rng.sample(FAQ_QUESTIONS, 2):
+        session.run(at.text_input(key="faq_input").input(question))
+
+
+def offers_flow(session: Session, rng: random.Random) -> None:
+    session.run()
+    session.run()  # Revisit: served from the Streamlit cache
+
+
+def run_customer(customer: int, sessions: int, order_ids: list, phones: list,
+                 timeout: float, trace: bool):
+    """Run one customer's sessions; return (timings per page, exception messages, db stats, pickups scheduled)."""
+    import db
+    db.set_statement_tracing(trace)
+
+    timings = defaultdict(list)
+    exceptions = []
+    scheduled = 0
+    flows, weights = zip(*FLOW_WEIGHTS.items())
+    rng = random.Random(customer)
+    Session("home", timeout).run()  # Untimed warm-up: imports and Streamlit resource caches
+
+    for _ in range(sessions):
+        page = rng.choices(flows, weights)[0]
+        session = Session(page, timeout)
+        try:
+            if page == "schedule":
+                schedule_flow(session, rng, f"05{rng.randrange(10 ** 8):08d}")
+                scheduled += 1
+            elif page == "track":
+                track_flow(session, rng, order_ids, phones)
+            elif page == "faq":
+                faq_flow(session, rng)
+            else:
+                offers_flow(session, rng)
+        except Exception as e:
+            session.exceptions.append(f"{type(e).__name__}: {e}")
+        timings[page].extend(session.timings)
+        exceptions.extend(session.exceptions)
+
+    return dict(timings), exceptions, db.get_db_stats(), scheduled
+
+
+def seed_orders(count: int):
+    """Insert orders to track; return (order_ids, phone numbers)."""
+    from backend import save_orders_bulk
+
+    start = datetime.now() + timedelta(days=2)
+    phones = [f"05{i:08d}" for i in range(max(count // 3, 1))]
+    orders = ({
+        "full_name": "Seed Customer",
+        "phone_number": phones[i % len(phones)],
+        "email": None,
+        "pickup_address": f"Villa {i}, Jumeirah, Dubai",
+        "pickup_date": (start + timedelta(days=i % 25)).strftime("%Y-%m-%d"),
+        "pickup_time": f"{8 + i % 12:02d}:00",
+        "service_type": "Wash & Fold Service",
+    } for i in range(count))
+    order_ids = [order_id for ok, order_id in save_orders_bulk(orders) if ok]
+    return order_ids, phones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=16, help="Concurrent customer processes")
+    parser.add_argument("--sessions", type=int, default=10, help="Sessions run by each customer")
+    parser.add_argument("--seed-orders", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds allowed per script run")
+    parser.add_argument("--no-trace", action="store_true", help="Skip counting SQL statements")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # config paths are relative, so the databases land here
+        order_ids, phones = seed_orders(args.seed_orders)
+        sample = random.Random(0).sample(order_ids, min(len(order_ids), 500))
+
+        # Spawned customers start with fresh module state and no inherited connections
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.customers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(run_customer, c, args.sessions, sample, phones,
+                                   args.timeout, not args.no_trace)
+                       for c in range(args.customers)]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+        import db
+        from config import DB_PATH
+        with db.connection(DB_PATH) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] - len(order_ids)
+        db.close_all()
+        os.chdir(REPO_ROOT)
+
+    timings = defaultdict(list)
+    exceptions = []
+    stats = defaultdict(int)
+    scheduled = 0
+    for worker_timings, worker_exceptions, worker_stats, worker_scheduled in results:
+        scheduled += worker_scheduled
+        for page, samples in worker_timings.items():
+            timings[page].extend(samples)
+        exceptions.extend(worker_exceptions)
+        for name, value in worker_stats.items():
+            stats[name] += value
+
+    sessions = args.customers * args.sessions
+    print(f"{sessions} sessions ({args.customers} customers x {args.sessions}) in {elapsed:.1f}s\n")
+    print(f"{'page':<10} {'runs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for page in FLOW_WEIGHTS:
+        samples = sorted(timings.get(page, []))
+        if not samples:
+            continue
+        print(f"{page:<10} {len(samples):>6} "
+              + " ".join(f"{percentile(samples, q) * 1000:>9.1f}" for q in (50, 95, 99))
+              + f" {samples[-1] * 1000:>9.1f}")
+
+    print()
+    for name in ("statements", "transactions", "connections", "busy_retries", "busy_failures"):
+        print(f"{name:<14} {stats[name]:>10}")
+    print(f"{'orders stored':<14} {stored:>10}")
+    print(f"{'exceptions':<14} {len(exceptions):>10}")
+    for message in sorted(set(exceptions))[:10]:
+        print(f"  {message}")
+    if stored != scheduled:
+        print(f"\n{scheduled} pickups were confirmed but {stored} orders were stored")
+    sys.exit(1 if exceptions or stats["busy_failures"] or stored != scheduled else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark bulk order ingestion against one-at-a-time save_order()
+
+Runs against a throwaway database in a temporary directory.
+
+Usage:
+    python benchmarks/bulk_import.py [--rows N] [--single-rows N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def synthetic_orders(count: int):
+    """Yield valid orders spread over the bookable window."""
+    start = datetime.now() + timedelta(days=2)
+    for i in range(count):
+        yield {
+            "full_name": "Test Customer",
+            "phone_number": f"05{i % 100000000:08d}",
+            "email": f"customer{i}@example.com",
+            "pickup_address": f"Villa {i}, Al Barsha, Dubai",
+            "pickup_date": (start + timedelta(days=i % 25)).strftime("%Y-%m-%d"),
+            "pickup_time": f"{8 + i % 12:02d}:{(i % 2) * 30:02d}",
+            "service_type": "Wash & Fold Service",
+            "notes": None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Orders for the bulk run")
+    parser.add_argument("--single-rows", type=int, default=2000, help="Orders for the save_order() run")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # config paths are relative, so the databases land here
+        from backend import save_order, save_orders_bulk
+
+        start = time.perf_counter()
+        for order in synthetic_orders(args.single_rows):
+            save_order(**order)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = save_orders_bulk(synthetic_orders(args.rows), chunk_size=args.chunk_size)
+        bulk = time.perf_counter() - start
+        failed = sum(1 for ok, _ in results if not ok)
+
+        print(f"save_order:       {args.single_rows:>8} rows  {args.single_rows / single:>10.0f} rows/s")
+        print(f"save_orders_bulk: {args.rows:>8} rows  {args.rows / bulk:>10.0f} rows/s  ({failed} failed)")
+        os.chdir(REPO_ROOT)
+
+
+if __name__ == "__main__":
+    main()
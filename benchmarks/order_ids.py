@@ -0,0 +1,71 @@
+"""
+Check order ID uniqueness and ordering under concurrency, and measure throughput
+
+Generates IDs from several threads in each of several processes, then checks
+that every ID is unique and that each process produced them in sorted order.
+
+Usage:
+    python benchmarks/order_ids.py [--processes N] [--threads N] [--ids N]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def generate_in_threads(threads: int, per_thread: int):
+    """Generate IDs from several threads; return (ids in generation order, seconds)."""
+    from backend import generate_order_id
+
+    lock = threading.Lock()
+    ordered = []
+
+    def worker():
+        local = [generate_order_id() for _ in range(per_thread)]
+        with lock:
+            ordered.append(local)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return ordered, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Threads per process")
+    parser.add_argument("--ids", type=int, default=50000, help="IDs per thread")
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [pool.submit(generate_in_threads, args.threads, args.ids) for _ in range(args.processes)]
+        results = [f.result() for f in futures]
+
+    all_ids = []
+    unsorted_threads = 0
+    for per_thread, elapsed in results:
+        for ids in per_thread:
+            unsorted_threads += ids != sorted(ids)
+            all_ids.extend(ids)
+        rate = args.threads * args.ids / elapsed
+        print(f"process: {args.threads * args.ids:>9} IDs  {rate:>10.0f} IDs/s")
+
+    duplicates = len(all_ids) - len(set(all_ids))
+    print(f"total:   {len(all_ids):>9} IDs  {duplicates} duplicates  "
+          f"{unsorted_threads} threads with out-of-order IDs")
+    sys.exit(1 if duplicates or unsorted_threads else 0)
+
+
+if __name__ == "__main__":
+    main()
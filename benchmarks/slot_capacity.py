@@ -0,0 +1,102 @@
+"""
+Load-test concurrent bookings of the same pickup slot
+
+Many threads in several processes call save_order() for one slot at once.
+The run passes when exactly the slot's capacity of bookings succeed and the
+slot_bookings count matches the orders actually stored.
+
+Runs against a throwaway database in a temporary directory.
+
+Usage:
+    python benchmarks/slot_capacity.py [--processes N] [--threads N] [--attempts N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+EMIRATE = "Dubai"
+PICKUP_TIME = "10:00"
+
+
+def book_in_threads(pickup_date: str, threads: int, attempts: int):
+    """Try to book the slot from several threads; return (successes, latencies)."""
+    from backend import save_order
+
+    lock = threading.Lock()
+    successes = []
+    latencies = []
+
+    def worker():
+        for _ in range(attempts):
+            start = time.perf_counter()
+            ok, result = save_order("Load Test", "0501234567", None, "Villa 1, Dubai",
+                                    pickup_date, PICKUP_TIME, "Wash & Fold Service", emirate=EMIRATE)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if ok:
+                    successes.append(result)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return successes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Threads per process")
+    parser.add_argument("--attempts", type=int, default=5, help="Bookings attempted per thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # config paths are relative, so the databases land here
+        from backend import ensure_orders_db, get_slot_availability, slot_capacity
+        from config import DB_PATH
+        from db import connection
+
+        ensure_orders_db()
+        pickup_date = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [pool.submit(book_in_threads, pickup_date, args.threads, args.attempts)
+                       for _ in range(args.processes)]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+        successes = [order_id for ok, _ in results for order_id in ok]
+        latencies = sorted(t for _, lat in results for t in lat)
+        with connection(DB_PATH) as conn:
+            stored = conn.execute(
+                "SELECT COUNT(*) FROM orders WHERE pickup_date = ? AND pickup_time = ? AND emirate = ?",
+                (pickup_date, PICKUP_TIME, EMIRATE)
+            ).fetchone()[0]
+        remaining = get_slot_availability(pickup_date, EMIRATE, [PICKUP_TIME])[PICKUP_TIME]
+        capacity = slot_capacity(EMIRATE)
+
+        print(f"attempts: {len(latencies)} in {elapsed:.2f}s  "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms  "
+              f"max {latencies[-1] * 1000:.1f} ms")
+        print(f"capacity: {capacity}  booked: {len(successes)}  stored: {stored}  remaining: {remaining}")
+        os.chdir(REPO_ROOT)
+
+    ok = len(successes) == stored == capacity and remaining == 0
+    print("PASS" if ok else "FAIL: slot was over- or under-booked")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Measure the cold-start time of app.py with python -X importtime
+
+Each run imports app.py in a fresh interpreter, inside an empty temporary
+directory, and parses the -X importtime report. It reports:
+- the total import time of app.py
+- the part spent importing third-party packages (mostly Streamlit)
+- the part under this repo's control: app.py's module code plus each project
+  module it imports
+- the slowest individual imports
+
+Outside `streamlit run`, Streamlit logs "missing ScriptRunContext" warnings
+and inspects the call stack, which inflates app.py's own time somewhat; the
+overhead is the same in every run, so releases stay comparable.
+
+The run fails when a module that should be deferred (pandas, numpy, pyarrow,
+openai, faq_data) is loaded at startup, or when a database file is created.
+
+Results are saved per release with --save. Later runs are compared with the
+most recently saved other release (or --baseline) and fail when the project
+share or the total is slower by more than the threshold. Baselines are
+machine-specific.
+
+Usage:
+    python benchmarks/startup.py [--runs 7] [--release LABEL] [--save]
+                                 [--baseline LABEL|PATH] [--threshold 0.25]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+PROJECT_MODULES = {
+    os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(REPO_ROOT, "*.py"))
+}
+
+# Modules only some pages need; importing any of them at startup is a regression
+DEFERRED_MODULES = ("pandas", "numpy", "pyarrow", "openai", "faq_data")
+
+# Results compared against the baseline
+COMPARED = ("project_ms", "total_ms")
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parse -X importtime output into (name, depth, self_us, cumulative_us) tuples, in output order."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        entries.append((name, depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def run_once() -> dict:
+    """Import app.py in a fresh interpreter; return timings in milliseconds and what it loaded."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Time a deployed server, which loads cached bytecode
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                              cwd=workdir, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        databases = sorted(os.path.basename(p) for p in glob.glob(os.path.join(workdir, "*.db")))
+    if proc.returncode:
+        sys.exit(f"Importing app.py failed:\n{proc.stderr[-2000:]}")
+
+    entries = parse_importtime(proc.stderr)
+    app_index = max(i for i, (name, depth, _, _) in enumerate(entries) if name == "app" and depth == 0)
+    app_self, app_total = entries[app_index][2], entries[app_index][3]
+
+    # Direct imports of app.py are printed just before it, at depth 1
+    modules = {"app.py module code": app_self / 1000}
+    third_party = 0
+    for name, depth, _, cumulative in reversed(entries[:app_index]):
+        if depth == 0:
+            break
+        if depth != 1:
+            continue
+        if name.split(".")[0] in PROJECT_MODULES:
+            modules[name] = cumulative / 1000
+        else:
+            third_party += cumulative
+
+    return {
+        "wall_ms": wall * 1000,
+        "total_ms": app_total / 1000,
+        "third_party_ms": third_party / 1000,
+        "project_ms": (app_total - third_party) / 1000,
+        "modules": modules,
+        "self_ms": {name: self_us / 1000 for name, _, self_us, _ in entries},
+        "deferred_loaded": sorted({name.split(".")[0] for name, _, _, _ in entries} & set(DEFERRED_MODULES)),
+        "databases": databases,
+    }
+
+
+def release_label() -> str:
+    """Name of the current release: the nearest git tag or the commit hash."""
+    try:
+        return subprocess.run(["git", "describe", "--tags", "--always", "--dirty"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "dev"
+
+
+def find_baseline(spec: str, release: str):
+    """Resolve --baseline (label or path), defaulting to the newest baseline of another release."""
+    if spec:
+        path = spec if os.path.exists(spec) else os.path.join(BASELINE_DIR, f"startup-{spec}.json")
+        return path if os.path.exists(path) else None
+    own = os.path.join(BASELINE_DIR, f"startup-{release}.json")
+    candidates = [p for p in glob.glob(os.path.join(BASELINE_DIR, "startup-*.json")) if p != own]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="Timed interpreter starts (median is reported)")
+    parser.add_argument("--release", help="Label to save results under (default: git describe)")
+    parser.add_argument("--save", action="store_true", help="Save the results as this release's baseline")
+    parser.add_argument("--baseline", help="Release label or JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+    release = args.release or release_label()
+
+    run_once()  # Untimed: writes bytecode caches so every timed run starts equally warm
+    runs = [run_once() for _ in range(args.runs)]
+
+    def median(key):
+        return statistics.median(run[key] for run in runs)
+
+    results = {key: round(median(key), 2) for key in ("wall_ms", "total_ms", "third_party_ms", "project_ms")}
+    modules = defaultdict(list)
+    self_ms = defaultdict(list)
+    for run in runs:
+        for name, ms in run["modules"].items():
+            modules[name].append(ms)
+        for name, ms in run["self_ms"].items():
+            self_ms[name].append(ms)
+    results["modules"] = {name: round(statistics.median(samples), 2) for name, samples in modules.items()}
+
+    print(f"Cold start of app.py, release {release}: median of {args.runs} runs\n")
+    print(f"{'':<36}{'ms':>10}")
+    print(f"{'process (interpreter + import app)':<36}{results['wall_ms']:>10.1f}")
+    print(f"{'import app':<36}{results['total_ms']:>10.1f}")
+    print(f"{'  third-party packages':<36}{results['third_party_ms']:>10.1f}")
+    print(f"{'  project code':<36}{results['project_ms']:>10.1f}")
+    for name, ms in sorted(results["modules"].items(), key=lambda item: -item[1]):
+        print(f"{'    ' + name:<36}{ms:>10.1f}")
+
+    print("\nSlowest imports (self time, ms)")
+    slowest = sorted(((statistics.median(samples), name) for name, samples in self_ms.items()), reverse=True)
+    for ms, name in slowest[:args.top]:
+        print(f"  {ms:>8.1f}  {name}")
+
+    deferred = sorted({name for run in runs for name in run["deferred_loaded"]})
+    databases = sorted({name for run in runs for name in run["databases"]})
+    print(f"\nDeferred modules loaded at startup: {', '.join(deferred) or 'none'}")
+    print(f"Databases created at startup: {', '.join(databases) or 'none'}")
+
+    regressions = []
+    baseline_path = find_baseline(args.baseline, release)
+    if baseline_path and not args.save:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline['meta']['release']} ({os.path.basename(baseline_path)})")
+        for key in COMPARED:
+            before, now = baseline["results"][key], results[key]
+            change = now / before - 1 if before else 0.0
+            line = f"  {key:<14}{before:>10.1f}{now:>10.1f}{change:>+9.0%}"
+            if change > args.threshold and now - before > args.min_delta_ms:
+                regressions.append(key)
+                line += "  REGRESSION"
+            print(line)
+    elif args.baseline:
+        print(f"\nNo baseline found for {args.baseline}")
+
+    if args.save:
+        path = os.path.join(BASELINE_DIR, f"startup-{release}.json")
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "meta": {
+                    "release": release, "runs": args.runs, "python": platform.python_version(),
+                    "machine": platform.platform(), "recorded": datetime.now().isoformat(timespec="seconds"),
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {path}")
+
+    sys.exit(1 if regressions or deferred or databases else 0)
+
+
+if __name__ == "__main__":
+    main()
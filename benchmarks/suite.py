@@ -0,0 +1,356 @@
+"""
+Benchmark suite for backend.py, faq_data.py and utils.py with regression baselines
+
+Seeds a throwaway database with N orders and scales the FAQ set to M entries,
+times every public backend function, FAQ retrieval (keyword and BM25) and the
+validators, and checks that hot queries are served by an index.
+
+Results are compared with a baseline JSON file for the same sizes; the run
+fails when any benchmark is slower than its baseline by more than the
+threshold. Baselines are machine-specific, so none are committed: record one
+with --save on the machine that runs the comparison. Without a baseline the
+run exits with status 2 before benchmarking, unless --no-baseline is given to
+only time the functions and check the query plans.
+
+Usage:
+    python benchmarks/suite.py [--orders 1000|100000|1000000] [--faqs 20|2000|20000]
+                               [--save | --baseline PATH | --no-baseline]
+                               [--threshold 0.5] [--only TEXT]
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+FAQ_QUERIES = [
+    "How long does dry cleaning take?",
+    "Is pickup free?",
+    "Do you deliver to Ajman?",
+    "Can you clean my wedding gown?",
+    "What if you damage my shirt?",
+    "Do you clean sofas?",
+    "Can you restore my leather handbag?",
+    "How do I book a pickup?",
+    "Where is my order?",
+    "Can I pay by card?",
+    "Any discounts right now?",
+    "Can you get a wine stain out?",
+    "What are your prices?",
+    "I need my pants hemmed",
+]
+
+SAMPLE_ORDER = {
+    "full_name": "Fatima Al Mansoori",
+    "phone_number": "+971 50 123 4567",
+    "email": "fatima@example.com",
+    "pickup_address": "Villa 12, Street 5, Al Barsha, Dubai",
+    "pickup_date": (date.today() + timedelta(days=5)).isoformat(),
+    "pickup_time": "14:30",
+}
+
+# Queries that must be answered from an index (no full table scan)
+INDEXED_QUERIES = [
+    ("orders by phone", "SELECT * FROM orders WHERE phone_e164 = ? ORDER BY created_at DESC LIMIT 1",
+     ("+971500000001",)),
+    ("orders page", "SELECT * FROM orders WHERE (created_at, order_id) < (?, ?) "
+                    "ORDER BY created_at DESC, order_id DESC LIMIT 100", ("2099-01-01", "")),
+    ("dispatch", "SELECT * FROM orders WHERE status = ? AND pickup_date = ? AND emirate = ?",
+     ("Scheduled", "2099-01-01", "Dubai")),
+    ("slot availability", "SELECT pickup_time, booked FROM slot_bookings WHERE pickup_date = ? AND emirate = ?",
+     ("2099-01-01", "Dubai")),
+    ("status history", "SELECT * FROM order_status_history WHERE order_id = ? ORDER BY changed_at",
+     ("CC",)),
+    ("notification dedup", "SELECT notification_id FROM notifications WHERE fingerprint = ? AND created_at >= ?",
+     ("x", "2099-01-01")),
+]
+
+
+def synthetic_orders(count: int, start_index: int = 0):
+    """Yield orders spread over phones, dates, slots and emirates."""
+    start = date.today() + timedelta(days=2)
+    emirates = ["Dubai", "Abu Dhabi", "Sharjah", "Ajman", "Ras Al Khaimah"]
+    for i in range(start_index, start_index + count):
+        yield {
+            "full_name": "Bench Customer",
+            "phone_number": f"05{i % 50000:08d}",
+            "email": None,
+            "pickup_address": f"Villa {i}, {emirates[i % 5]}",
+            "pickup_date": str(start + timedelta(days=i % 28)),
+            "pickup_time": f"{8 + i % 12:02d}:{(i // 12) % 2 * 30:02d}",
+            "service_type": "Wash & Fold Service",
+        }
+
+
+def scale_faqs(count: int) -> None:
+    """Grow FAQ_DATA to ``count`` entries with numbered copies of the real FAQs."""
+    import faq_data
+
+    base = list(faq_data.FAQ_DATA)
+    scaled = []
+    for i in range(count):
+        item, copy = base[i % len(base)], i // len(base)
+        scaled.append(dict(item, question=f"{item['question']} ({copy})") if copy else item)
+    faq_data.FAQ_DATA[:] = scaled
+
+
+def build_benchmarks(order_ids, phones):
+    """Return {name: zero-argument callable} for everything under test."""
+    import backend
+    import faq_data
+    import utils
+    from config import NOTIFICATION_BATCH_SIZE
+
+    rng = random.Random(1)
+    sample_ids = rng.sample(order_ids, min(len(order_ids), 1000))
+    ids = itertools.cycle(sample_ids)
+    phone_cycle = itertools.cycle(phones)
+    queries = itertools.cycle(FAQ_QUERIES)
+    dispatch_dates = itertools.cycle(str(date.today() + timedelta(days=2 + d)) for d in range(28))
+    statuses = itertools.cycle(["Confirmed", "Scheduled"])
+    new_orders = itertools.count()
+
+    # Far-future slots so every save finds room; three orders per slot
+    def save_order():
+        n = next(new_orders)
+        day = date(2099, 1, 1) + timedelta(days=n // 72)
+        slot = f"{8 + n // 3 % 24 // 2:02d}:{n // 3 % 2 * 30:02d}"
+        backend.save_order("Bench Customer", "0501234567", None, "Villa 1, Sharjah",
+                           str(day), slot, "Wash & Fold Service")
+
+    bulk_start = itertools.count(10 ** 7, 1000)
+
+    def save_orders_bulk():
+        backend.save_orders_bulk(synthetic_orders(1000, next(bulk_start)), validate=False)
+
+    middle = backend.get_order(order_id=sample_ids[0])
+    deep_cursor = (middle["created_at"], middle["order_id"])
+
+    def iter_orders_10k():
+        for _ in itertools.islice(backend.iter_orders(), 10000):
+            pass
+
+    def export_orders_csv():
+        backend.export_orders_csv(io.StringIO())
+
+    def get_active_offers_cold():
+        backend.invalidate_offers_cache()
+        backend.get_active_offers("all")
+
+    # Expired offers: the table grows but the active snapshot stays the same
+    new_offers = itertools.count()
+
+    def add_offer():
+        backend.add_offer(f"Bench Offer {next(new_offers)}", "Benchmark offer", 10, None,
+                          "2000-01-01", "2000-01-31")
+
+    # A full batch is written as soon as it is queued, so flushing times the
+    # batch insert rather than the writer's flush interval. Unique messages,
+    # so each notification is inserted rather than coalesced.
+    notification_numbers = itertools.count()
+
+    def log_notifications_flushed(count):
+        def run():
+            for _ in range(count):
+                backend.log_notification(None, next(phone_cycle), "bench",
+                                         f"Customer asked about order {next(notification_numbers)}")
+            backend.flush_notifications()
+        return run
+
+    def faq_uncached(fn, method):
+        def run():
+            faq_data.clear_faq_cache()
+            fn(next(queries), method=method)
+        return run
+
+    return {
+        # backend.py; writes run after the reads so the reads see the seeded data
+        "backend.generate_order_id": backend.generate_order_id,
+        "backend.get_order[order_id]": lambda: backend.get_order(order_id=next(ids)),
+        "backend.get_order[phone]": lambda: backend.get_order(phone_number=next(phone_cycle)),
+        "backend.get_orders_page[first]": lambda: backend.get_orders_page(100),
+        "backend.get_orders_page[deep]": lambda: backend.get_orders_page(100, deep_cursor),
+        "backend.iter_orders[10k rows]": iter_orders_10k,
+        "backend.get_all_orders": backend.get_all_orders,
+        "backend.export_orders_csv": export_orders_csv,
+        "backend.get_slot_availability": lambda: backend.get_slot_availability(
+            next(dispatch_dates), "Dubai", utils.get_time_slots(30)),
+        "backend.get_status_history": lambda: backend.get_status_history(next(ids)),
+        "backend.get_dispatch_orders": lambda: backend.get_dispatch_orders(next(dispatch_dates), emirate="Dubai"),
+        "backend.get_notifications": backend.get_notifications,
+        "backend.get_active_offers": lambda: backend.get_active_offers("all"),
+        "backend.get_active_offers[cold]": get_active_offers_cold,
+        "backend.update_order_status": lambda: backend.update_order_status(next(ids), next(statuses)),
+        "backend.bulk_update_status[100]": lambda: backend.bulk_update_status(
+            rng.sample(sample_ids, 100), next(statuses)),
+        "backend.log_notification": lambda: backend.log_notification(
+            None, next(phone_cycle), "bench", "Customer asked about their order"),
+        "backend.log_notification[batch, flushed]": log_notifications_flushed(NOTIFICATION_BATCH_SIZE),
+        "backend.add_offer": add_offer,
+        "backend.save_order": save_order,
+        "backend.save_orders_bulk[1000 rows]": save_orders_bulk,
+        # faq_data.py
+        "faq.retrieve_faq_answer[keyword]": faq_uncached(faq_data.retrieve_faq_answer, "keyword"),
+        "faq.retrieve_faq_answer[bm25]": faq_uncached(faq_data.retrieve_faq_answer, "bm25"),
+        "faq.retrieve_faq_answer[cached]": lambda: faq_data.retrieve_faq_answer(next(queries)),
+        "faq.search_faq[keyword]": faq_uncached(faq_data.search_faq, "keyword"),
+        "faq.search_faq[bm25]": faq_uncached(faq_data.search_faq, "bm25"),
+        # utils.py
+        "utils.validate_order_fields": lambda: utils.validate_order_fields(SAMPLE_ORDER),
+        "utils.validate_phone_number": lambda: utils.validate_phone_number("+971 50 123 4567"),
+        "utils.normalize_phone_number": lambda: utils.normalize_phone_number("050 123 4567"),
+        "utils.format_phone_for_display": lambda: utils.format_phone_for_display("971501234567"),
+        "utils.validate_email": lambda: utils.validate_email("fatima@example.com"),
+        "utils.validate_full_name": lambda: utils.validate_full_name("Fatima Al Mansoori"),
+        "utils.validate_address": lambda: utils.validate_address("Villa 12, Street 5, Al Barsha"),
+        "utils.validate_pickup_date": lambda: utils.validate_pickup_date(SAMPLE_ORDER["pickup_date"]),
+        "utils.validate_pickup_time": lambda: utils.validate_pickup_time("14:30"),
+        "utils.get_future_dates": lambda: utils.get_future_dates(30),
+        "utils.get_time_slots": lambda: utils.get_time_slots(30),
+    }
+
+
+def time_call(fn, repeat: int, target_seconds: float) -> float:
+    """
+    Fastest seconds per call over ``repeat`` timed batches.
+
+    The minimum is the least noisy estimate on a shared machine: slower
+    batches were slowed by something other than the code under test.
+    """
+    start = time.perf_counter()
+    fn()
+    single = time.perf_counter() - start
+    number = max(1, min(10000, int(target_seconds / max(single, 1e-7))))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return min(samples)
+
+
+def check_query_plans() -> list:
+    """Return the names of INDEXED_QUERIES whose plan scans a whole table."""
+    from config import DB_PATH
+    from db import explain_query_plan
+
+    failures = []
+    for name, query, params in INDEXED_QUERIES:
+        plan = explain_query_plan(DB_PATH, query, params)
+        if any(step.startswith("SCAN ") and "USING" not in step for step in plan):
+            failures.append(f"{name}: {'; '.join(plan)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1000, help="Orders seeded into the database")
+    parser.add_argument("--faqs", type=int, default=20, help="FAQ entries to rank against")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed batches per benchmark")
+    parser.add_argument("--target", type=float, default=0.05, help="Approximate seconds per timed batch")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--baseline", help="Baseline JSON (default: benchmarks/baselines/<sizes>.json)")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="Run without comparing against a baseline instead of failing when none exists")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Allowed slowdown against the baseline (0.5 = 50%%)")
+    parser.add_argument("--min-delta-us", type=float, default=2.0,
+                        help="Ignore slowdowns smaller than this many microseconds per call")
+    args = parser.parse_args()
+
+    baseline_path = args.baseline or os.path.join(
+        BENCH_DIR, "baselines", f"suite-{args.orders}-orders-{args.faqs}-faqs.json")
+    compare = not args.save and not args.no_baseline
+    if compare and not os.path.exists(baseline_path):
+        # A silent pass here would let every regression through on a fresh checkout
+        print(f"No baseline at {baseline_path}; record one on this machine with --save, "
+              f"or pass --no-baseline to run without regression checks", file=sys.stderr)
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # config paths are relative, so the databases land here
+        import backend
+
+        print(f"Seeding {args.orders} orders and {args.faqs} FAQs...", flush=True)
+        start = time.perf_counter()
+        results = backend.save_orders_bulk(synthetic_orders(args.orders), chunk_size=10000, validate=False)
+        order_ids = [order_id for ok, order_id in results if ok]
+        phones = sorted({f"05{i % 50000:08d}" for i in range(min(args.orders, 50000))})
+        scale_faqs(args.faqs)
+        for i in range(1000):
+            backend.log_notification(None, phones[i % len(phones)], "seed", f"Seed notification {i}")
+        backend.flush_notifications()
+        for status in ("Confirmed", "Scheduled"):
+            backend.bulk_update_status(order_ids[::10], status)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s\n")
+
+        benchmarks = build_benchmarks(order_ids, phones)
+        timings = {}
+        print(f"{'benchmark':<40}{'us/call':>14}{'baseline':>12}{'change':>9}")
+
+        baseline = {}
+        if compare:
+            with open(baseline_path) as f:
+                baseline = json.load(f)["results"]
+
+        regressions = []
+        for name, fn in benchmarks.items():
+            if args.only and args.only not in name:
+                continue
+            us = time_call(fn, args.repeat, args.target) * 1e6
+            timings[name] = round(us, 3)
+            line = f"{name:<40}{us:>14.1f}"
+            if name in baseline:
+                change = us / baseline[name] - 1
+                line += f"{baseline[name]:>12.1f}{change:>+9.0%}"
+                if change > args.threshold and us - baseline[name] > args.min_delta_us:
+                    regressions.append(name)
+                    line += "  REGRESSION"
+            print(line, flush=True)
+
+        backend.flush_notifications()
+        plan_failures = check_query_plans()
+        os.chdir(REPO_ROOT)
+
+    print()
+    for failure in plan_failures:
+        print(f"NOT INDEXED  {failure}")
+    if not plan_failures:
+        print(f"All {len(INDEXED_QUERIES)} hot queries use an index")
+
+    if args.save:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump({
+                "meta": {
+                    "orders": args.orders, "faqs": args.faqs,
+                    "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                    "machine": platform.platform(), "recorded": datetime.now().isoformat(timespec="seconds"),
+                },
+                "results": timings,
+            }, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {baseline_path}")
+    elif not compare:
+        print("Not compared with a baseline (--no-baseline)")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+    sys.exit(1 if regressions or plan_failures else 0)
+
+
+if __name__ == "__main__":
+    main()
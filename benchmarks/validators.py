@@ -0,0 +1,63 @@
+"""
+Micro-benchmark for the input validators in utils.py
+
+Usage:
+    python benchmarks/validators.py [--number N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (
+    validate_phone_number, normalize_phone_number, format_phone_for_display,
+    validate_email, validate_full_name, validate_order_fields
+)
+
+SAMPLE_ORDER = {
+    "full_name": "Fatima Al Mansoori",
+    "phone_number": "+971 50 123 4567",
+    "email": "fatima@example.com",
+    "pickup_address": "Villa 12, Street 5, Al Barsha, Dubai",
+    "pickup_date": "2099-01-01",  # Fails the 30-day window, still exercises the parser
+    "pickup_time": "14:30",
+}
+
+
+def legacy_validate_phone_number(phone: str):
+    """Previous implementation, kept here as the comparison baseline."""
+    phone_clean = re.sub(r'[^\d+]', '', phone)
+    for pattern in [r'^\+971\d{9}$', r'^0\d{9}$', r'^971\d{9}$']:
+        if re.match(pattern, phone_clean):
+            return (True, "")
+    return (False, "Please enter a valid UAE phone number (e.g., +971501234567 or 0501234567)")
+
+
+CASES = [
+    ("legacy phone validation", lambda: legacy_validate_phone_number("0501234567")),
+    ("validate_phone_number", lambda: validate_phone_number("0501234567")),
+    ("normalize_phone_number", lambda: normalize_phone_number("+971 50 123 4567")),
+    ("format_phone_for_display", lambda: format_phone_for_display("971501234567")),
+    ("validate_email", lambda: validate_email("fatima@example.com")),
+    ("validate_full_name", lambda: validate_full_name("Fatima Al Mansoori")),
+    ("validate_order_fields", lambda: validate_order_fields(SAMPLE_ORDER)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000, help="Calls per case")
+    args = parser.parse_args()
+
+    print(f"{'case':<28}{'ns/call':>10}")
+    for name, func in CASES:
+        best = min(timeit.repeat(func, number=args.number, repeat=3))
+        print(f"{name:<28}{best / args.number * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
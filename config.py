@@ -38,10 +38,81 @@ COVERAGE_AREAS = [
     "Ras Al Khaimah"
 ]
 
+# Order lifecycle, in the order an order moves through it
+ORDER_STATUSES = [
+    "Scheduled",
+    "Confirmed",
+    "Collected",
+    "Completed",
+    "Cancelled"
+]
+
+# Pickup slot capacity: bookings allowed per (date, time slot, emirate)
+SLOT_CAPACITY = 3
+SLOT_CAPACITY_BY_EMIRATE = {      # Overrides SLOT_CAPACITY for busier areas
+    "Dubai": 5,
+    "Abu Dhabi": 4
+}
+
+# Pickup hours as (first hour, closing hour); the last slot starts before closing.
+# Overrides are keyed by weekday name; None means no pickups that day.
+PICKUP_HOURS = (8, 20)
+PICKUP_HOURS_BY_WEEKDAY = {}      # e.g. {"Friday": (14, 20)}
+PICKUP_HOURS_BY_EMIRATE = {}      # e.g. {"Sharjah": {"Friday": None}}; wins over the weekday default
+
+# Dates (YYYY-MM-DD) with no pickups, everywhere or in one emirate
+PICKUP_HOLIDAYS = []
+PICKUP_HOLIDAYS_BY_EMIRATE = {}   # e.g. {"Dubai": ["2025-12-02"]}
+
 # Database configuration
 DB_PATH = "champion_orders.db"
 OFFERS_DB_PATH = "champion_offers.db"
 
+# Connection pool settings
+DB_POOL_SIZE = 8                # Idle connections kept open per database
+DB_STATEMENT_CACHE_SIZE = 128   # Compiled statements cached per connection
+
+# SQLite storage tuning (applied to every new connection)
+DB_JOURNAL_MODE = "WAL"         # WAL lets readers run alongside a writer
+DB_SYNCHRONOUS = "NORMAL"       # Safe with WAL; FULL fsyncs every commit
+DB_BUSY_TIMEOUT_MS = 5000       # How long SQLite waits on a lock before SQLITE_BUSY
+DB_CACHE_SIZE_KB = 16384        # Page cache per connection
+DB_MMAP_SIZE = 64 * 1024 * 1024 # Bytes of the file to memory-map (0 disables)
+
+# Retry policy for writes that still hit SQLITE_BUSY
+DB_BUSY_MAX_RETRIES = 5
+DB_BUSY_BACKOFF_SECONDS = 0.05  # First delay; doubles on each retry
+DB_BUSY_BACKOFF_MAX_SECONDS = 1.0
+
+# Team notifications are written in batches by a background thread
+NOTIFICATIONS_ASYNC = True
+NOTIFICATION_BATCH_SIZE = 200            # Rows per insert transaction
+NOTIFICATION_FLUSH_INTERVAL_MS = 100     # Max time a queued row waits for its batch
+NOTIFICATION_QUEUE_MAXSIZE = 10000       # Queued rows before callers write inline
+NOTIFICATION_ENQUEUE_TIMEOUT_SECONDS = 0.05
+NOTIFICATION_DEDUP_WINDOW_SECONDS = 900  # Repeats within this window bump hit_count (0 disables)
+
+# Backend offers snapshot: reload from the database at least this often (seconds)
+OFFERS_SNAPSHOT_MAX_AGE_SECONDS = 900
+
+# Streamlit cache lifetimes (seconds)
+OFFERS_CACHE_TTL_SECONDS = 300
+SLOT_AVAILABILITY_CACHE_TTL_SECONDS = 30  # Bookings from other server processes show up within this
+
+# Call metrics for backend and FAQ functions (see metrics.py)
+METRICS_ENABLED = True
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ADMIN_PANEL_ENABLED = False  # Show the metrics panel in the app sidebar
+
+# User interaction analytics (see analytics.py): buffered in memory, written as JSONL by a background thread
+ANALYTICS_ENABLED = True
+ANALYTICS_DIR = "analytics"                  # Event files and daily rollups
+ANALYTICS_BUFFER_SIZE = 10000                # Ring buffer size; the oldest events are dropped when full
+ANALYTICS_BATCH_SIZE = 500                   # Buffered events that wake the writer early
+ANALYTICS_FLUSH_INTERVAL_SECONDS = 2.0       # Max time an event waits in the buffer
+ANALYTICS_MAX_FILE_BYTES = 16 * 1024 * 1024  # Start a new event file past this size
+ANALYTICS_ROTATE_SECONDS = 3600              # ... or after this long (files never span midnight)
+
 # Application settings
 APP_TITLE = "Champion Cleaners Assistant"
 APP_SUBTITLE = "Your trusted laundry & dry cleaning service in the UAE"
@@ -0,0 +1,331 @@
+"""
+SQLite connection management for Champion Cleaners backend
+"""
+
+import atexit
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from config import (
+    DB_POOL_SIZE, DB_STATEMENT_CACHE_SIZE, DB_JOURNAL_MODE, DB_SYNCHRONOUS,
+    DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_BUSY_MAX_RETRIES,
+    DB_BUSY_BACKOFF_SECONDS, DB_BUSY_BACKOFF_MAX_SECONDS
+)
+from metrics import record_busy_retry
+
+T = TypeVar("T")
+
+# Pragmas applied to every new connection, in order
+CONNECTION_PRAGMAS = [
+    ("journal_mode", DB_JOURNAL_MODE),
+    ("synchronous", DB_SYNCHRONOUS),
+    ("busy_timeout", DB_BUSY_TIMEOUT_MS),
+    ("cache_size", -DB_CACHE_SIZE_KB),
+    ("mmap_size", DB_MMAP_SIZE),
+]
+
+# Process-wide counters for load tests and diagnostics; see get_db_stats()
+_stats: Dict[str, int] = dict.fromkeys(
+    ("connections", "transactions", "statements", "busy_retries", "busy_failures"), 0
+)
+_stats_lock = threading.Lock()
+_trace_statements = False
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _count_statement(_sql: str) -> None:
+    _count("statements")
+
+
+def set_statement_tracing(enabled: bool) -> None:
+    """
+    Count every SQL statement executed (including BEGIN/COMMIT and pragmas).
+
+    Off by default because the trace callback costs a Python call per
+    statement. Only affects connections opened after the call, so enable it
+    before the first database access.
+    """
+    global _trace_statements
+    _trace_statements = enabled
+
+
+def get_db_stats() -> Dict[str, int]:
+    """
+    Get this process's database counters.
+
+    Returns:
+        Dictionary with connections opened, transactions started, statements
+        executed (0 unless tracing is on), busy_retries (SQLITE_BUSY retried by
+        run_transaction) and busy_failures (given up after the last retry)
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_db_stats() -> None:
+    """Zero the database counters."""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived connections to a single SQLite file.
+
+    Connections are opened in autocommit mode; transactions are managed
+    explicitly by ``transaction()``. A thread that already holds a connection
+    gets the same one back on nested use, so helpers can share a transaction.
+    Each connection keeps its own compiled-statement cache, which is what makes
+    reusing connections cheaper than reconnecting.
+    """
+
+    def __init__(self, db_path: str, max_idle: int = DB_POOL_SIZE):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection configured for pooled use."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        if _trace_statements:
+            conn.set_trace_callback(_count_statement)
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        _count("connections")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection, reusing the one this thread already holds."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Get (or create) the process-wide pool for a database file."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+
+@contextmanager
+def connection(db_path: str) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection for reads.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Yields:
+        Connection with ``sqlite3.Row`` row factory
+    """
+    with get_pool(db_path).acquire() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction(db_path: str, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection and run the block in a single transaction.
+
+    Commits when the block succeeds and rolls back if it raises. Nested use on
+    the same thread joins the outer transaction.
+
+    Args:
+        db_path: Path to the SQLite database file
+        immediate: Take the write lock up front (BEGIN IMMEDIATE)
+
+    Yields:
+        Connection inside an open transaction
+    """
+    with get_pool(db_path).acquire() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        _count("transactions")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def is_busy_error(error: Exception) -> bool:
+    """Check whether an exception is SQLITE_BUSY / SQLITE_LOCKED."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def run_transaction(db_path: str, work: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run ``work(conn, *args, **kwargs)`` in a write transaction, retrying on SQLITE_BUSY.
+
+    The write lock is taken up front (BEGIN IMMEDIATE) so a busy database is
+    detected before any work is done. Each retry re-runs ``work`` from the start
+    after an exponential backoff with jitter.
+
+    Args:
+        db_path: Path to the SQLite database file
+        work: Callable receiving the connection as its first argument
+
+    Returns:
+        Whatever ``work`` returns
+    """
+    delay = DB_BUSY_BACKOFF_SECONDS
+    for attempt in range(DB_BUSY_MAX_RETRIES + 1):
+        try:
+            with transaction(db_path, immediate=True) as conn:
+                return work(conn, *args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e):
+                raise
+            if attempt == DB_BUSY_MAX_RETRIES:
+                _count("busy_failures")
+                raise
+            _count("busy_retries")
+            record_busy_retry()
+        time.sleep(delay * (0.5 + random.random()))
+        delay = min(delay * 2, DB_BUSY_BACKOFF_MAX_SECONDS)
+
+
+def apply_migrations(conn: sqlite3.Connection,
+                     migrations: Sequence[Tuple[int, str, Sequence[str]]]) -> int:
+    """
+    Bring a database up to the latest schema version.
+
+    Applied versions are recorded in a ``schema_migrations`` table, so each
+    migration runs exactly once per database file. Call inside a transaction.
+
+    Args:
+        conn: Connection with an open transaction
+        migrations: (version, description, statements) tuples in ascending order
+
+    Returns:
+        Schema version after migrating
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+    for version, description, statements in migrations:
+        if version <= current:
+            continue
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute("INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                     (version, description))
+        current = version
+
+    return current
+
+
+_initialized: set = set()
+_init_lock = threading.Lock()
+
+
+def initialize_once(db_path: str, initializer: Callable[[sqlite3.Connection], object]) -> None:
+    """
+    Run a schema initializer for a database the first time it is needed in this process.
+
+    After the first successful run this is a set lookup, so hot paths can call
+    it freely instead of re-running DDL and seed checks on every request.
+
+    Args:
+        db_path: Path to the SQLite database file
+        initializer: Callable that migrates the schema inside a transaction
+    """
+    if db_path in _initialized:
+        return
+    with _init_lock:
+        if db_path not in _initialized:
+            run_transaction(db_path, initializer)
+            _initialized.add(db_path)
+
+
+def explain_query_plan(db_path: str, query: str, params: Sequence = ()) -> List[str]:
+    """Return the EXPLAIN QUERY PLAN detail lines for a query."""
+    with connection(db_path) as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    return [row["detail"] for row in rows]
+
+
+def close_all(db_path: Optional[str] = None) -> None:
+    """Close idle pooled connections for one database, or for all of them."""
+    with _pools_lock:
+        pools = [_pools[db_path]] if db_path in _pools else ([] if db_path else list(_pools.values()))
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all)
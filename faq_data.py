@@ -2,11 +2,48 @@
 FAQ data and retrieval system for Champion Cleaners
 """
 
+import math
 import re
-from typing import List, Tuple
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from metrics import instrument
+
+
+class FAQList(list):
+    """
+    List of FAQ entries that counts its own modifications.
+    
+    Every operation that adds, removes, replaces or reorders entries bumps
+    ``version``, so the indexes notice changes such as ``FAQ_DATA[:] = other``
+    without rescanning the entries on each query. Edits inside an entry are
+    not seen by the list: make them with update_faq(), or call
+    rebuild_faq_index() afterwards.
+    """
+    
+    version = 0
+
+
+def _tracked(name: str):
+    method = getattr(list, name)
+    
+    def tracked(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.version += 1
+        return result
+    
+    tracked.__name__ = name
+    return tracked
+
+
+for _name in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend",
+              "insert", "pop", "remove", "clear", "sort", "reverse"):
+    setattr(FAQList, _name, _tracked(_name))
+
 
 # Comprehensive FAQ data from Champion Cleaners
-FAQ_DATA = [
+FAQ_DATA = FAQList([
     {
         "question": "What is your turnaround time for dry cleaning?",
         "answer": "Standard dry cleaning typically takes 3-5 business days. Express service is available for an additional fee and takes 24-48 hours. Please check our website for current timelines.",
@@ -107,7 +144,15 @@ FAQ_DATA = [
         "answer": "Our Hanger Amnesty program ensures your garments are returned on appropriate, quality hangers. We take care with presentation and protection of your cleaned items.",
         "keywords": ["hanger", "amnesty", "hangers"]
     }
-]
+])
+
+
+_NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def normalize_query(text: str) -> str:
+    """Case-fold text and collapse punctuation and whitespace runs to single spaces."""
+    return _NON_WORD_PATTERN.sub(" ", text.casefold()).strip()
 
 
 def calculate_similarity(query: str, faq_item: dict) -> float:
@@ -121,7 +166,7 @@ def calculate_similarity(query: str, faq_item: dict) -> float:
     Returns:
         Similarity score (0-1)
     """
-    query_lower = query.lower()
+    query_lower = normalize_query(query)
     score = 0.0
     
     # Check against keywords (higher weight)
@@ -130,7 +175,7 @@ def calculate_similarity(query: str, faq_item: dict) -> float:
     score += keyword_matches * 0.4
     
     # Check against question words
-    question_words = faq_item.get("question", "").lower().split()
+    question_words = normalize_query(faq_item.get("question", "")).split()
     question_matches = sum(1 for word in question_words if len(word) > 3 and word in query_lower)
     score += min(question_matches * 0.1, 0.3)
     
@@ -139,12 +184,333 @@ def calculate_similarity(query: str, faq_item: dict) -> float:
     return score
 
 
-def retrieve_faq_answer(query: str) -> Tuple[str, str, float]:
+class FAQIndex:
+    """
+    Inverted index from match terms to the FAQs that contain them.
+    
+    Scores exactly like calculate_similarity(), but only touches FAQs that
+    share at least one term with the query, so lookup cost depends on the
+    query length rather than the number of FAQs.
+    """
+    
+    def __init__(self, faq_data: List[dict]):
+        self.faq_data = faq_data
+        self.by_question = {faq.get("question", ""): faq for faq in reversed(faq_data)}
+        # term -> {faq position: [keyword hits, question word hits]}
+        self.terms: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        # Terms containing whitespace can span query words; matched by substring
+        self.phrases: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        
+        for position, faq in enumerate(faq_data):
+            for kw in faq.get("keywords", []):
+                self._add(kw, position, 0)
+            for word in normalize_query(faq.get("question", "")).split():
+                if len(word) > 3:
+                    self._add(word, position, 1)
+        
+        lengths = [len(term) for term in self.terms] or [0]
+        self.min_len = min(lengths)
+        self.max_len = max(lengths)
+    
+    def _add(self, term: str, position: int, slot: int) -> None:
+        table = self.phrases if (not term or any(c.isspace() for c in term)) else self.terms
+        hits = table[term].setdefault(position, [0, 0])
+        hits[slot] += 1
+    
+    def _matched_terms(self, query_lower: str) -> set:
+        """Find every indexed term that occurs as a substring of the query."""
+        matched = set()
+        for token in set(query_lower.split()):
+            for length in range(self.min_len, min(self.max_len, len(token)) + 1):
+                for start in range(len(token) - length + 1):
+                    term = token[start:start + length]
+                    if term in self.terms:
+                        matched.add(term)
+        return matched
+    
+    def score(self, query: str) -> Dict[int, float]:
+        """
+        Score candidate FAQs for a query.
+        
+        Args:
+            query: User's question
+            
+        Returns:
+            Mapping of FAQ position to similarity score (0-1); FAQs with no
+            matching term are omitted
+        """
+        query_lower = normalize_query(query)
+        hits: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        
+        postings = [self.terms[term] for term in self._matched_terms(query_lower)]
+        postings += [faqs for phrase, faqs in self.phrases.items() if phrase in query_lower]
+        for faqs in postings:
+            for position, (keyword_hits, question_hits) in faqs.items():
+                counts = hits[position]
+                counts[0] += keyword_hits
+                counts[1] += question_hits
+        
+        scores = {}
+        for position, (keyword_matches, question_matches) in hits.items():
+            score = keyword_matches * 0.4
+            score += min(question_matches * 0.1, 0.3)
+            scores[position] = min(score, 1.0)
+        return scores
+    
+    def rank(self, query: str, min_score: float = 0.0) -> List[Tuple[dict, float]]:
+        """Return (faq, score) pairs above min_score, best first, ties in FAQ order."""
+        ranked = sorted(
+            (item for item in self.score(query).items() if item[1] > min_score),
+            key=lambda item: (-item[1], item[0])
+        )
+        return [(self.faq_data[position], score) for position, score in ranked]
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words too common in questions to help ranking
+STOPWORDS = frozenset("""
+    a about an and are can do does for from have how i in is it me my of on or
+    the to what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase ranking terms.
+    
+    Drops stopwords and folds simple plurals ("gowns" -> "gown") so questions
+    and keywords meet on the same terms.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 ranking over FAQ questions and keywords.
+    
+    Per-term BM25 weights are precomputed into a sparse CSR-style term matrix
+    (NumPy arrays), so a query scores every FAQ with one gather and one
+    ``bincount`` instead of a Python loop over FAQs.
+    """
+    
+    def __init__(self, faq_data: List[dict], k1: float = 1.2, b: float = 0.75):
+        import numpy as np
+        
+        self.faq_data = faq_data
+        self._np = np
+        docs = [
+            Counter(tokenize(faq.get("question", "")) + tokenize(" ".join(faq.get("keywords", []))))
+            for faq in faq_data
+        ]
+        n_docs = len(docs)
+        doc_lengths = np.array([sum(doc.values()) for doc in docs], dtype=float)
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+        
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for position, doc in enumerate(docs):
+            for term, tf in doc.items():
+                postings[term].append((position, tf))
+        
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Dict[str, float] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for term, entries in postings.items():
+            idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.vocabulary[term] = len(self.vocabulary)
+            self.idf[term] = idf
+            for position, tf in entries:
+                norm = k1 * (1 - b + b * doc_lengths[position] / avg_length)
+                indices.append(position)
+                data.append(idf * tf * (k1 + 1) / (tf + norm))
+            indptr.append(len(indices))
+        
+        self.n_docs = n_docs
+        # Weight a query term missing from every FAQ as if its df were zero
+        self.unseen_idf = math.log(1 + (n_docs + 0.5) / 0.5)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.data = np.array(data, dtype=float)
+    
+    def score(self, query: str):
+        """
+        Score every FAQ for a query.
+        
+        Raw BM25 is divided by the summed IDF of the query terms, giving a
+        0-1 confidence comparable to the keyword scorer.
+        
+        Returns:
+            NumPy array of confidences, one per FAQ
+        """
+        np = self._np
+        terms = tokenize(query)
+        max_score = sum(self.idf.get(term, self.unseen_idf) for term in terms)
+        rows = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+        if not rows or max_score <= 0:
+            return np.zeros(self.n_docs)
+        
+        slices = [np.arange(self.indptr[row], self.indptr[row + 1]) for row in rows]
+        entries = np.concatenate(slices)
+        scores = np.bincount(self.indices[entries], weights=self.data[entries], minlength=self.n_docs)
+        return np.minimum(scores / max_score, 1.0)
+    
+    def rank(self, query: str, min_score: float = 0.0) -> List[Tuple[dict, float]]:
+        """Return (faq, score) pairs above min_score, best first, ties in FAQ order."""
+        np = self._np
+        scores = self.score(query)
+        candidates = np.flatnonzero(scores > min_score)
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.faq_data[position], float(scores[position])) for position in order]
+
+
+# Ranking methods accepted by retrieve_faq_answer() and search_faq()
+RANKING_METHODS = ("keyword", "bm25")
+
+# Maximum number of distinct normalized queries kept in the ranking cache
+FAQ_CACHE_SIZE = 512
+
+def _data_signature() -> Tuple[int, int, int]:
+    """Identify the current FAQ_DATA contents without reading the entries."""
+    return (id(FAQ_DATA), len(FAQ_DATA), getattr(FAQ_DATA, "version", 0))
+
+
+_faq_index = FAQIndex(FAQ_DATA)
+_faq_signature = _data_signature()
+_bm25_index: Optional[BM25Index] = None
+
+_ranking_cache: "OrderedDict[Tuple[str, str], FAQRanking]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+@instrument()
+def rebuild_faq_index() -> None:
+    """Rebuild the FAQ indexes and drop cached rankings after FAQ_DATA has been modified."""
+    global _faq_index, _faq_signature, _bm25_index
+    with _cache_lock:
+        _faq_index = FAQIndex(FAQ_DATA)
+        _faq_signature = _data_signature()
+        _bm25_index = None
+        _ranking_cache.clear()
+
+
+def _get_index(method: str):
+    """Get the ranking index for a method, building BM25 on first use."""
+    global _bm25_index
+    # Changes to the FAQ_DATA list, or a list swapped in for it, are picked up
+    # automatically; edits inside an entry go through update_faq()
+    if _data_signature() != _faq_signature:
+        rebuild_faq_index()
+    if method == "keyword":
+        return _faq_index
+    if method == "bm25":
+        if _bm25_index is None:
+            _bm25_index = BM25Index(FAQ_DATA)
+        return _bm25_index
+    raise ValueError(f"Unknown FAQ ranking method: {method!r} (expected one of {RANKING_METHODS})")
+
+
+# Minimum scores for a best answer and for related questions
+ANSWER_MIN_SCORE = 0.15
+RELATED_MIN_SCORE = 0.1
+
+
+class FAQRanking:
+    """
+    Ranked FAQ matches for one query, produced by a single scoring pass.
+    
+    Holds every FAQ scoring above RELATED_MIN_SCORE (best first), so the best
+    answer and related questions are read from the same ranking.
+    """
+    
+    def __init__(self, query: str, matches: List[Tuple[dict, float]]):
+        self.query = query
+        self.matches = tuple(matches)
+    
+    @property
+    def best(self) -> Tuple[str, str, float]:
+        """Best answer as (question, answer, confidence), or ("", "", 0.0) if none is confident."""
+        if self.matches and self.matches[0][1] > ANSWER_MIN_SCORE:
+            faq, score = self.matches[0]
+            return (faq["question"], faq["answer"], score)
+        return ("", "", 0.0)
+    
+    def related(self, count: int = 3) -> List[dict]:
+        """Next most relevant FAQs after the best match, with scores."""
+        return self.results()[1:count + 1]
+    
+    def results(self) -> List[dict]:
+        """All matches as FAQ dictionaries with a "score" key."""
+        return [{**faq, "score": score} for faq, score in self.matches]
+
+
+@instrument(rows=lambda ranking: len(ranking.matches))
+def rank_faq(query: str, k: Optional[int] = None, method: str = "keyword") -> FAQRanking:
+    """
+    Rank FAQs for a query in one scoring pass.
+    
+    Args:
+        query: User's question
+        k: Keep only the top k matches (None keeps all)
+        method: Ranking method, "keyword" or "bm25"
+        
+    Returns:
+        FAQRanking with the best answer, related questions and scores
+    """
+    if not query or len(query.strip()) < 3:
+        return FAQRanking(query, [])
+    
+    index = _get_index(method)
+    key = (normalize_query(query), method)
+    with _cache_lock:
+        ranking = _ranking_cache.get(key)
+        if ranking is not None:
+            _ranking_cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+    
+    if ranking is None:
+        ranking = FAQRanking(query, index.rank(query, min_score=RELATED_MIN_SCORE))
+        with _cache_lock:
+            _cache_stats["misses"] += 1
+            _ranking_cache[key] = ranking
+            if len(_ranking_cache) > FAQ_CACHE_SIZE:
+                _ranking_cache.popitem(last=False)
+    
+    if k is None:
+        return ranking
+    return FAQRanking(query, ranking.matches[:k])
+
+
+def get_faq_cache_stats() -> Dict[str, int]:
+    """Get ranking cache counters (hits, misses, size, maxsize) for monitoring."""
+    with _cache_lock:
+        return {**_cache_stats, "size": len(_ranking_cache), "maxsize": FAQ_CACHE_SIZE}
+
+
+def clear_faq_cache() -> None:
+    """Drop all cached rankings and reset the counters."""
+    with _cache_lock:
+        _ranking_cache.clear()
+        _cache_stats["hits"] = _cache_stats["misses"] = 0
+
+
+@instrument()
+def retrieve_faq_answer(query: str, method: str = "keyword") -> Tuple[str, str, float]:
     """
     Retrieve the best matching FAQ answer for a user query.
     
     Args:
         query: User's question
+        method: Ranking method, "keyword" or "bm25"
         
     Returns:
         Tuple of (question, answer, confidence_score)
@@ -152,24 +518,7 @@ def retrieve_faq_answer(query: str) -> Tuple[str, str, float]:
     if not query or len(query.strip()) < 3:
         return ("", "Please ask a more specific question.", 0.0)
     
-    best_match = None
-    best_score = 0.0
-    
-    for faq in FAQ_DATA:
-        score = calculate_similarity(query, faq)
-        if score > best_score:
-            best_score = score
-            best_match = faq
-    
-    # Return match only if confidence is reasonable
-    if best_match and best_score > 0.15:
-        return (
-            best_match["question"],
-            best_match["answer"],
-            best_score
-        )
-    
-    return ("", "", 0.0)
+    return rank_faq(query, k=1, method=method).best
 
 
 def get_all_faq() -> List[dict]:
@@ -177,25 +526,41 @@ def get_all_faq() -> List[dict]:
     return FAQ_DATA
 
 
-def search_faq(query: str) -> List[dict]:
+@instrument()
+def get_faq_by_question(question: str) -> Optional[dict]:
+    """Look up an FAQ item by its exact question text, without scoring."""
+    return _get_index("keyword").by_question.get(question)
+
+
+def update_faq(question: str, **fields) -> bool:
+    """
+    Edit an FAQ entry in place and rebuild the indexes.
+    
+    Args:
+        question: Exact question text of the entry to edit
+        **fields: Keys to set on the entry (question, answer, keywords)
+        
+    Returns:
+        True if the entry was found and updated
+    """
+    faq = _get_index("keyword").by_question.get(question)
+    if faq is None:
+        return False
+    faq.update(fields)
+    rebuild_faq_index()
+    return True
+
+
+@instrument()
+def search_faq(query: str, method: str = "keyword") -> List[dict]:
     """
     Search FAQ for items matching the query.
     
     Args:
         query: Search query
+        method: Ranking method, "keyword" or "bm25"
         
     Returns:
         List of matching FAQ items with scores
     """
-    results = []
-    for faq in FAQ_DATA:
-        score = calculate_similarity(query, faq)
-        if score > 0.1:
-            results.append({
-                **faq,
-                "score": score
-            })
-    
-    # Sort by score
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results
+    return rank_faq(query, method=method).results()
@@ -0,0 +1,72 @@
+"""
+Bulk-import pickup orders from a CSV or JSONL file
+
+Usage:
+    python import_orders.py orders.csv
+    python import_orders.py partner_orders.jsonl --chunk-size 5000
+
+Each row needs the order fields used by the schedule form: full_name,
+phone_number, email (optional), pickup_address, pickup_date (YYYY-MM-DD),
+pickup_time (HH:MM), service_type and notes (optional).
+"""
+
+import argparse
+import csv
+import json
+import sys
+from typing import Dict, Iterator, Optional
+
+from backend import save_orders_bulk
+
+
+def read_orders(path: str, errors: Dict[int, str]) -> Iterator[Optional[Dict]]:
+    """
+    Stream order dictionaries from a .csv or .jsonl file.
+    
+    A JSONL line that is not a JSON object is yielded as None, so it still
+    gets a (failed) result, and the reason is stored in errors under its row
+    number (counting from 1, blank lines skipped).
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            row = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                row += 1
+                try:
+                    order = json.loads(line)
+                except ValueError as e:
+                    errors[row] = f"Malformed JSON: {e}"
+                    yield None
+                    continue
+                if not isinstance(order, dict):
+                    errors[row] = f"Expected a JSON object, got {type(order).__name__}"
+                    yield None
+                    continue
+                yield order
+        else:
+            yield from csv.DictReader(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV or JSONL file of orders")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Orders per transaction")
+    parser.add_argument("--no-validate", action="store_true", help="Skip form validation (trusted sources only)")
+    args = parser.parse_args()
+
+    parse_errors: Dict[int, str] = {}
+    results = save_orders_bulk(read_orders(args.path, parse_errors), chunk_size=args.chunk_size,
+                               validate=not args.no_validate)
+
+    failed = [(line, parse_errors.get(line, message))
+              for line, (ok, message) in enumerate(results, 1) if not ok]
+    for line, message in failed:
+        print(f"Row {line}: {message}", file=sys.stderr)
+    print(f"Imported {len(results) - len(failed)} of {len(results)} orders")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+In-process call metrics for Champion Cleaners backend and FAQ functions
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import METRICS_ENABLED, METRICS_LATENCY_BUCKETS
+
+
+class CallStats:
+    """Counters and latency histogram for one instrumented function."""
+
+    __slots__ = ("calls", "errors", "rows", "busy_retries", "total_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.busy_retries = 0
+        self.total_seconds = 0.0
+        # One count per bucket upper bound, plus a final +Inf bucket
+        self.buckets = [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile (seconds) as the upper bound of its bucket."""
+        if not self.calls:
+            return 0.0
+        rank, seen = q * self.calls, 0
+        for bound, count in zip(METRICS_LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+_registry: Dict[str, CallStats] = {}
+_lock = threading.Lock()
+_active = threading.local()  # Stack of instrumented call names running on this thread
+
+
+def _stats(name: str) -> CallStats:
+    stats = _registry.get(name)
+    if stats is None:
+        with _lock:
+            stats = _registry.setdefault(name, CallStats())
+    return stats
+
+
+def _stack() -> List[str]:
+    stack = getattr(_active, "stack", None)
+    if stack is None:
+        stack = _active.stack = []
+    return stack
+
+
+def _current() -> Optional[str]:
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def count_rows(result) -> Optional[int]:
+    """Default row counter: list length, 1 for a dict, 0 for None."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    if result is None:
+        return 0
+    return None
+
+
+def _record(name: str, seconds: float, rows: Optional[int], failed: bool) -> None:
+    stats = _stats(name)
+    index = bisect_left(METRICS_LATENCY_BUCKETS, seconds)
+    with _lock:
+        stats.calls += 1
+        stats.total_seconds += seconds
+        stats.buckets[index] += 1
+        if rows:
+            stats.rows += rows
+        if failed:
+            stats.errors += 1
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Record the duration of a block under ``name``.
+
+    Errors reported with log_error() and busy retries inside the block are
+    attributed to it; an exception escaping the block counts as an error.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    stack = _stack()
+    stack.append(name)
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        stack.pop()
+        _record(name, time.perf_counter() - start, None, failed)
+
+
+def instrument(name: Optional[str] = None,
+               rows: Callable[[object], Optional[int]] = count_rows) -> Callable:
+    """
+    Decorator recording calls, latency, rows returned and errors of a function.
+
+    Generator functions are timed over the whole iteration, and every yielded
+    item counts as a row. Errors and busy retries are attributed to the
+    generator while its body runs, not while the consumer handles an item.
+
+    Args:
+        name: Metric name (default: "<module>.<function>")
+        rows: Returns the row count for a result, or None if not applicable
+    """
+    def decorate(func: Callable) -> Callable:
+        metric = name or f"{func.__module__}.{func.__name__}"
+        if not METRICS_ENABLED:
+            return func
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                start, count, failed = time.perf_counter(), 0, True
+                gen = func(*args, **kwargs)
+                try:
+                    while True:
+                        # Mark the call as running only while the generator body
+                        # runs; the consumer may resume it from another thread
+                        stack = _stack()
+                        stack.append(metric)
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            break
+                        finally:
+                            stack.pop()
+                        count += 1
+                        try:
+                            yield item
+                        except GeneratorExit:
+                            stack = _stack()
+                            stack.append(metric)
+                            try:
+                                gen.close()  # Consumer stopped early
+                            finally:
+                                stack.pop()
+                            failed = False
+                            raise
+                    failed = False
+                finally:
+                    _record(metric, time.perf_counter() - start, count, failed)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = _stack()
+            stack.append(metric)
+            start, result, failed = time.perf_counter(), None, True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                stack.pop()
+                _record(metric, time.perf_counter() - start,
+                        None if failed else rows(result), failed)
+        return wrapper
+
+    return decorate
+
+
+def log_error(message: str, error: Exception) -> None:
+    """Print a handled error and count it against the running instrumented call."""
+    print(f"{message}: {str(error)}")
+    name = _current()
+    if name is not None:
+        stats = _stats(name)
+        with _lock:
+            stats.errors += 1
+
+
+def record_busy_retry() -> None:
+    """Count a SQLITE_BUSY retry against the running instrumented call."""
+    name = _current()
+    if name is not None:
+        stats = _stats(name)
+        with _lock:
+            stats.busy_retries += 1
+
+
+def get_metrics() -> List[Dict]:
+    """
+    Snapshot every instrumented function's metrics.
+
+    Returns:
+        One dictionary per function (sorted by name) with calls, errors, rows,
+        busy_retries, total/mean seconds and bucket-estimated p50/p95/p99 seconds
+    """
+    with _lock:
+        snapshot = []
+        for name in sorted(_registry):
+            stats = _registry[name]
+            snapshot.append({
+                "name": name,
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "rows": stats.rows,
+                "busy_retries": stats.busy_retries,
+                "total_seconds": stats.total_seconds,
+                "mean_seconds": stats.total_seconds / stats.calls if stats.calls else 0.0,
+                "p50_seconds": stats.quantile(0.50),
+                "p95_seconds": stats.quantile(0.95),
+                "p99_seconds": stats.quantile(0.99),
+            })
+    return snapshot
+
+
+def reset_metrics() -> None:
+    """Forget all recorded metrics."""
+    with _lock:
+        _registry.clear()
+
+
+def render_prometheus(prefix: str = "champion") -> str:
+    """
+    Dump all metrics in the Prometheus text exposition format.
+
+    Args:
+        prefix: Prefix for every metric name
+
+    Returns:
+        Exposition text, one sample per line
+    """
+    with _lock:
+        items = [(name, _registry[name]) for name in sorted(_registry)]
+        lines = []
+        counters = [
+            ("calls_total", "Calls made", "calls"),
+            ("errors_total", "Calls that failed or reported an error", "errors"),
+            ("rows_total", "Rows returned", "rows"),
+            ("busy_retries_total", "SQLITE_BUSY retries", "busy_retries"),
+        ]
+        for suffix, help_text, attr in counters:
+            lines.append(f"# HELP {prefix}_{suffix} {help_text}")
+            lines.append(f"# TYPE {prefix}_{suffix} counter")
+            for name, stats in items:
+                lines.append(f'{prefix}_{suffix}{{function="{name}"}} {getattr(stats, attr)}')
+
+        histogram = f"{prefix}_call_duration_seconds"
+        lines.append(f"# HELP {histogram} Call latency")
+        lines.append(f"# TYPE {histogram} histogram")
+        for name, stats in items:
+            cumulative = 0
+            for bound, count in zip(list(METRICS_LATENCY_BUCKETS) + ["+Inf"], stats.buckets):
+                cumulative += count
+                lines.append(f'{histogram}_bucket{{function="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{histogram}_sum{{function="{name}"}} {stats.total_seconds:.6f}')
+            lines.append(f'{histogram}_count{{function="{name}"}} {stats.calls}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,48 @@
+"""
+Notification deduplication: repeats of one event are coalesced, distinct
+orders are not.
+"""
+
+import pytest
+
+import backend
+import db
+
+
+@pytest.fixture
+def orders_db(tmp_path):
+    path = str(tmp_path / "orders.db")
+    db.run_transaction(path, backend._create_orders_tables)
+    yield path
+    db.close_all(path)
+
+
+def _row(order_id, phone_number, query_type, message, created_at="2025-01-01 10:00:00"):
+    return (order_id, phone_number, query_type, message, created_at,
+            backend.notification_fingerprint(order_id, phone_number, query_type, message))
+
+
+def _notifications(path):
+    with db.connection(path) as conn:
+        return [tuple(row) for row in conn.execute(
+            "SELECT order_id, hit_count FROM notifications ORDER BY notification_id"
+        )]
+
+
+def test_repeats_of_one_event_are_coalesced(orders_db):
+    message = "Customer searched for non-existent order ID: CCX"
+    rows = [_row(None, "unknown", "order_not_found", message),
+            _row(None, "unknown", "order_not_found", message.upper(), "2025-01-01 10:01:00")]
+    db.run_transaction(orders_db, backend._write_notifications, rows)
+
+    assert _notifications(orders_db) == [(None, 2)]
+
+
+def test_distinct_orders_are_not_coalesced(orders_db):
+    message = "New pickup order scheduled: Dry Cleaning on 2025-01-02 at 10:00"
+    db.run_transaction(orders_db, backend._write_notifications,
+                       [_row("CCA", "+971501234567", "new_pickup_scheduled", message)])
+    db.run_transaction(orders_db, backend._write_notifications,
+                       [_row("CCB", "+971501234567", "new_pickup_scheduled", message, "2025-01-01 10:01:00")])
+
+    assert _notifications(orders_db) == [("CCA", 1), ("CCB", 1)]
@@ -0,0 +1,61 @@
+"""
+The hot queries in backend.py must be served by an index, without a full
+table scan or a temporary B-tree for sorting.
+"""
+
+import pytest
+
+import backend
+import db
+
+# (name, query as issued by backend.py, parameters)
+HOT_QUERIES = [
+    ("order by phone",
+     "SELECT * FROM orders WHERE phone_e164 = ? ORDER BY created_at DESC LIMIT 1",
+     ("+971500000001",)),
+    ("orders first page",
+     "SELECT * FROM orders ORDER BY created_at DESC, order_id DESC LIMIT ?",
+     (100,)),
+    ("orders next page",
+     "SELECT * FROM orders WHERE (created_at, order_id) < (?, ?) ORDER BY created_at DESC, order_id DESC LIMIT ?",
+     ("2099-01-01", "", 100)),
+    ("dispatch by status and pickup date",
+     "SELECT * FROM orders WHERE status = ? AND pickup_date = ? ORDER BY pickup_time, order_id",
+     ("Scheduled", "2099-01-01")),
+    ("dispatch by status, pickup date and emirate",
+     "SELECT * FROM orders WHERE status = ? AND pickup_date = ? AND emirate = ? ORDER BY pickup_time, order_id",
+     ("Scheduled", "2099-01-01", "Dubai")),
+    ("status history",
+     "SELECT old_status, new_status, changed_at FROM order_status_history "
+     "WHERE order_id = ? ORDER BY changed_at, history_id",
+     ("CC",)),
+    ("slot availability",
+     "SELECT pickup_time, booked FROM slot_bookings WHERE pickup_date = ? AND emirate = ?",
+     ("2099-01-01", "Dubai")),
+    ("recent notifications",
+     "SELECT * FROM notifications ORDER BY created_at DESC LIMIT ?",
+     (50,)),
+    ("notification dedup",
+     "SELECT notification_id FROM notifications WHERE fingerprint = ? AND created_at >= ? "
+     "ORDER BY created_at DESC LIMIT 1",
+     ("x", "2099-01-01 00:00:00")),
+]
+
+
+@pytest.fixture(scope="module")
+def orders_db(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("plans") / "orders.db")
+    db.run_transaction(path, backend._create_orders_tables)
+    yield path
+    db.close_all(path)
+
+
+@pytest.mark.parametrize("name, query, params", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(orders_db, name, query, params):
+    plan = db.explain_query_plan(orders_db, query, params)
+    
+    assert plan
+    for step in plan:
+        if step.startswith(("SCAN ", "SEARCH ")):
+            assert " USING " in step, f"{name} reads a whole table: {plan}"
+        assert "TEMP B-TREE" not in step, f"{name} sorts in a temporary B-tree: {plan}"
@@ -3,8 +3,45 @@ Utility functions for Champion Cleaners Assistant
 """
 
 import re
-from datetime import datetime, timedelta
-from typing import Tuple, Optional
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional
+
+from analytics import record_event
+from config import (
+    COVERAGE_AREAS, PICKUP_HOURS, PICKUP_HOURS_BY_WEEKDAY, PICKUP_HOURS_BY_EMIRATE,
+    PICKUP_HOLIDAYS, PICKUP_HOLIDAYS_BY_EMIRATE
+)
+
+
+# Validation patterns, compiled once at import
+PHONE_STRIP_PATTERN = re.compile(r'[^\d+]')
+# UAE phone formats: +971XXXXXXXXX, 971XXXXXXXXX or 0XXXXXXXXX; group 1 is the subscriber number
+UAE_PHONE_PATTERN = re.compile(r'(?:\+971|971|0)(\d{9})')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+NAME_PATTERN = re.compile(r"^[a-zA-Z\s\-']+$")
+# Longest names first so "Ras Al Khaimah" is not shadowed by a shorter match
+EMIRATE_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(area) for area in sorted(COVERAGE_AREAS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+_EMIRATES_BY_KEY = {area.casefold(): area for area in COVERAGE_AREAS}
+
+
+def normalize_phone_number(phone: str) -> Optional[str]:
+    """
+    Normalize a UAE phone number to E.164 form.
+    
+    Args:
+        phone: Phone number in any accepted UAE format, spacing allowed
+        
+    Returns:
+        E.164 number (e.g., +971501234567), or None if the number is not valid
+    """
+    match = UAE_PHONE_PATTERN.fullmatch(PHONE_STRIP_PATTERN.sub('', phone))
+    if match:
+        return '+971' + match.group(1)
+    return None
 
 
 def validate_phone_number(phone: str) -> Tuple[bool, str]:
@@ -17,31 +54,27 @@ def validate_phone_number(phone: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    # Remove spaces and special characters
-    phone_clean = re.sub(r'[^\d+]', '', phone)
-    
-    # UAE phone patterns: +971XXXXXXXXX or 0501234567 or 971501234567
-    uae_patterns = [
-        r'^\+971\d{9}$',     # +971 format
-        r'^0\d{9}$',         # 0 format
-        r'^971\d{9}$'        # 971 format
-    ]
-    
-    for pattern in uae_patterns:
-        if re.match(pattern, phone_clean):
-            return (True, "")
-    
+    if normalize_phone_number(phone):
+        return (True, "")
     return (False, "Please enter a valid UAE phone number (e.g., +971501234567 or 0501234567)")
 
 
 def validate_email(email: str) -> Tuple[bool, str]:
     """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.match(pattern, email):
+    if EMAIL_PATTERN.match(email):
         return (True, "")
     return (False, "Please enter a valid email address")
 
 
+@lru_cache(maxsize=1024)
+def _parse_date(date_str: str) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD string, memoized since forms and imports repeat a few dates."""
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
 def validate_pickup_date(date_str: str) -> Tuple[bool, str]:
     """
     Validate pickup date (must be in future and not more than 30 days away).
@@ -52,26 +85,26 @@ def validate_pickup_date(date_str: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    try:
-        pickup_date = datetime.strptime(date_str, "%Y-%m-%d")
-        today = datetime.now()
-        
-        # Must be at least 24 hours in future
-        min_date = today + timedelta(hours=24)
-        if pickup_date < min_date:
-            return (False, "Pickup date must be at least 24 hours in the future")
-        
-        # Must not be more than 30 days in future
-        max_date = today + timedelta(days=30)
-        if pickup_date > max_date:
-            return (False, "Pickup date must be within 30 days")
-        
-        return (True, "")
-    
-    except ValueError:
+    pickup_date = _parse_date(date_str)
+    if pickup_date is None:
         return (False, "Please enter a valid date (YYYY-MM-DD)")
+    
+    today = datetime.now()
+    
+    # Must be at least 24 hours in future
+    min_date = today + timedelta(hours=24)
+    if pickup_date < min_date:
+        return (False, "Pickup date must be at least 24 hours in the future")
+    
+    # Must not be more than 30 days in future
+    max_date = today + timedelta(days=30)
+    if pickup_date > max_date:
+        return (False, "Pickup date must be within 30 days")
+    
+    return (True, "")
 
 
+@lru_cache(maxsize=1024)
 def validate_pickup_time(time_str: str) -> Tuple[bool, str]:
     """
     Validate pickup time format.
@@ -96,7 +129,7 @@ def validate_full_name(name: str) -> Tuple[bool, str]:
         return (False, "Name must be at least 3 characters")
     if len(name) > 100:
         return (False, "Name must not exceed 100 characters")
-    if not re.match(r"^[a-zA-Z\s\-']+$", name):
+    if not NAME_PATTERN.match(name):
         return (False, "Name can only contain letters, spaces, hyphens, and apostrophes")
     return (True, "")
 
@@ -111,9 +144,47 @@ def validate_address(address: str) -> Tuple[bool, str]:
     return (True, "")
 
 
+def validate_order_fields(fields: Dict[str, Optional[str]]) -> List[str]:
+    """
+    Validate all pickup order fields in one pass.
+    
+    Args:
+        fields: Dictionary with full_name, phone_number, email (optional),
+                pickup_address, pickup_date and pickup_time
+        
+    Returns:
+        List of error messages in form order (empty if everything is valid)
+    """
+    errors = []
+    checks = [
+        ("full_name", "Full name is required", validate_full_name),
+        ("phone_number", "Phone number is required", validate_phone_number),
+        ("email", None, validate_email),  # Optional: only checked when given
+        ("pickup_address", "Pickup address is required", validate_address),
+        ("pickup_date", "Pickup date is required", validate_pickup_date),
+        ("pickup_time", "Pickup time is required", validate_pickup_time),
+    ]
+    
+    for field, missing_message, validator in checks:
+        value = fields.get(field)
+        if not value:
+            if missing_message:
+                errors.append(missing_message)
+            continue
+        valid, msg = validator(value)
+        if not valid:
+            errors.append(msg)
+    
+    return errors
+
+
 def format_phone_for_display(phone: str) -> str:
     """Format phone number for display."""
-    phone_clean = re.sub(r'[^\d+]', '', phone)
+    normalized = normalize_phone_number(phone)
+    if normalized:
+        return normalized
+    
+    phone_clean = PHONE_STRIP_PATTERN.sub('', phone)
     if phone_clean.startswith('+971'):
         return phone_clean
     elif phone_clean.startswith('0'):
@@ -123,35 +194,98 @@ def format_phone_for_display(phone: str) -> str:
     return phone
 
 
-def get_future_dates(days: int = 30) -> list:
-    """Get list of valid future dates for date picker."""
-    dates = []
-    today = datetime.now()
-    start_date = today + timedelta(days=1)
+def detect_emirate(address: Optional[str]) -> Optional[str]:
+    """
+    Find which coverage area an address is in.
     
-    for i in range(days):
-        date = start_date + timedelta(days=i)
-        dates.append(date.strftime("%Y-%m-%d"))
+    Args:
+        address: Free-text pickup address
+        
+    Returns:
+        Emirate name as listed in COVERAGE_AREAS, or None if none is mentioned
+    """
+    if not address:
+        return None
+    match = EMIRATE_PATTERN.search(address)
+    if match:
+        return _EMIRATES_BY_KEY[match.group(1).casefold()]
+    return None
+
+
+# Weekday names as used in the config.py overrides, independent of locale
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def get_pickup_hours(pickup_date: str, emirate: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """
+    Get pickup hours for a date from the config.py calendar.
     
-    return dates
+    Args:
+        pickup_date: Date in format YYYY-MM-DD
+        emirate: Coverage area whose overrides apply (None for the defaults)
+        
+    Returns:
+        (first hour, closing hour), or None if there are no pickups that day
+    """
+    if pickup_date in PICKUP_HOLIDAYS or pickup_date in PICKUP_HOLIDAYS_BY_EMIRATE.get(emirate, ()):
+        return None
+    parsed = _parse_date(pickup_date)
+    if parsed is None:
+        return None
+    weekday = WEEKDAYS[parsed.weekday()]
+    by_weekday = PICKUP_HOURS_BY_EMIRATE.get(emirate, {})
+    if weekday in by_weekday:
+        return by_weekday[weekday]
+    return PICKUP_HOURS_BY_WEEKDAY.get(weekday, PICKUP_HOURS)
+
 
+@lru_cache(maxsize=64)
+def _future_dates(today: str, days: int, emirate: Optional[str]) -> Tuple[str, ...]:
+    start = date.fromisoformat(today)
+    dates = (str(start + timedelta(days=i)) for i in range(1, days + 1))
+    return tuple(d for d in dates if get_pickup_hours(d, emirate))
 
-def get_time_slots(interval_minutes: int = 30) -> list:
-    """Get list of time slots for pickup."""
-    slots = []
-    hour = 8  # Start at 8 AM
-    minute = 0
+
+def get_future_dates(days: int = 30, emirate: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Get the bookable pickup dates for the date picker.
     
-    while hour < 20:  # End at 8 PM
-        time_str = f"{hour:02d}:{minute:02d}"
-        slots.append(time_str)
+    Covers the ``days`` days after today, skipping holidays and closed days.
+    Memoized per calendar day, so it is only rebuilt after midnight.
+    
+    Args:
+        days: Number of days ahead to cover, starting tomorrow
+        emirate: Coverage area whose holidays and hours apply
         
-        minute += interval_minutes
-        if minute >= 60:
-            minute = 0
-            hour += 1
+    Returns:
+        Dates in format YYYY-MM-DD, in order
+    """
+    return _future_dates(date.today().isoformat(), days, emirate)
+
+
+@lru_cache(maxsize=64)
+def _time_slots(first_hour: int, closing_hour: int, interval_minutes: int) -> Tuple[str, ...]:
+    return tuple(f"{minute // 60:02d}:{minute % 60:02d}"
+                 for minute in range(first_hour * 60, closing_hour * 60, interval_minutes))
+
+
+def get_time_slots(interval_minutes: int = 30, pickup_date: Optional[str] = None,
+                   emirate: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Get the pickup time slots for a day.
     
-    return slots
+    Args:
+        interval_minutes: Minutes between slot start times
+        pickup_date: Date in format YYYY-MM-DD (default pickup hours if None)
+        emirate: Coverage area whose hours apply
+        
+    Returns:
+        Slot start times in format HH:MM (empty if there are no pickups that day)
+    """
+    hours = get_pickup_hours(pickup_date, emirate) if pickup_date else PICKUP_HOURS
+    if not hours:
+        return ()
+    return _time_slots(hours[0], hours[1], interval_minutes)
 
 
 def get_greeting_message(hour: Optional[int] = None) -> str:
@@ -176,12 +310,13 @@ def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
 
 def log_user_interaction(interaction_type: str, data: dict) -> None:
     """
-    Log user interactions for analytics (placeholder for future enhancement).
+    Log a user interaction for analytics.
+    
+    Returns immediately: the event is buffered in memory and written to the
+    analytics event files by a background thread (see analytics.py).
     
     Args:
         interaction_type: Type of interaction (schedule, track, faq, etc.)
-        data: Interaction data
+        data: Interaction data (JSON-serializable, no personal details)
     """
-    timestamp = datetime.now().isoformat()
-    # In future: send to analytics service or log file
-    pass
+    record_event(interaction_type, data)